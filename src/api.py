@@ -1,19 +1,129 @@
-import os, time, requests
-from typing import Dict, Any, Optional
+import os, random, threading, time, requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, List, Mapping, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from . import metrics, quota
 
-API_BASE = "https://v3.football.api-sports.io"
+API_BASE = os.getenv("API_FOOTBALL_BASE", "https://v3.football.api-sports.io")
 API_KEY = os.getenv("API_FOOTBALL_KEY", "")
 QPS_DELAY = 0.8
+RATE = float(os.getenv("API_FOOTBALL_RATE", str(1 / QPS_DELAY)))  # zahteva u sekundi
+BURST = int(os.getenv("API_FOOTBALL_BURST", "1"))
+ADAPTIVE = os.getenv("API_FOOTBALL_ADAPTIVE", "1") == "1"  # tempo po x-ratelimit headerima
+WORKERS = int(os.getenv("API_FOOTBALL_WORKERS", "4"))
 RETRIES = 3
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+TIMEOUT = 20
 
-_last_call = 0.0
+class ApiError(RuntimeError):
+    def __init__(self, status: int, text: str):
+        super().__init__(f"API error {status}: {text}")
+        self.status = status
 
-def _throttle():
-    global _last_call
-    delta = time.time() - _last_call
-    if delta < QPS_DELAY:
-        time.sleep(QPS_DELAY - delta)
-    _last_call = time.time()
+class QuotaExceeded(ApiError):
+    pass
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        # svaki poziv rezerviše token odmah, pa čeka svoj dug van locka
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def adapt(self, rate: float, burst: int) -> None:
+        with self._lock:
+            self.rate = rate
+            self.burst = burst
+            self.tokens = min(self.tokens, burst)
+
+    def pause(self, seconds: float) -> None:
+        # sledeći pozivi čekaju dok se minutni prozor ne obnovi
+        with self._lock:
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+class SharedTokenBucket(TokenBucket):
+    # isti bucket za više procesa (backfill): stanje u multiprocessing.Value, lock je međuprocesni
+    def __init__(self, rate: float, burst: int, ctx=None):
+        import multiprocessing
+        ctx = ctx or multiprocessing.get_context()
+        self._state = ctx.Array("d", [rate, float(burst), float(burst), time.monotonic()])
+        self._lock = self._state.get_lock()
+
+    rate = property(lambda self: self._state[0], lambda self, v: self._state.__setitem__(0, v))
+    burst = property(lambda self: self._state[1], lambda self, v: self._state.__setitem__(1, v))
+    tokens = property(lambda self: self._state[2], lambda self, v: self._state.__setitem__(2, v))
+    stamp = property(lambda self: self._state[3], lambda self, v: self._state.__setitem__(3, v))
+
+_bucket = TokenBucket(RATE, BURST)
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_pool: Optional[ThreadPoolExecutor] = None
+
+def _get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(WORKERS, 1))
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _session = s
+        return _session
+
+def _throttle() -> float:
+    return _bucket.acquire()
+
+def _backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+def _sleep(seconds: float) -> None:
+    metrics.count("api", "backoff_sec", seconds)
+    time.sleep(seconds)
+
+def _header_int(headers: Mapping[str, str], name: str) -> Optional[int]:
+    try:
+        return int(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def _observe(headers: Mapping[str, str]) -> None:
+    quota.observe(
+        _header_int(headers, "x-ratelimit-requests-limit"),
+        _header_int(headers, "x-ratelimit-requests-remaining"),
+    )
+    if not ADAPTIVE:
+        return
+    per_minute = _header_int(headers, "X-RateLimit-Limit")
+    left = _header_int(headers, "X-RateLimit-Remaining")
+    if per_minute:
+        # plan od N/min podnosi N/60 u sekundi; burst do desetine minutnog limita
+        _bucket.adapt(per_minute / 60.0, max(1, min(per_minute // 10, WORKERS)))
+    if left is not None and left <= 1:
+        _bucket.pause(60 - time.time() % 60)
+
+def _body_errors(data: Any) -> Dict[str, Any]:
+    # API-Football često vraća 200 sa greškom u telu ("errors" je [] kad je sve ok)
+    errors = data.get("errors") if isinstance(data, dict) else None
+    return errors if isinstance(errors, dict) else {}
 
 def get(path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     if not API_KEY:
@@ -23,10 +133,65 @@ def get(path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         "x-apisports-key": API_KEY,
         "Accept": "application/json",
     }
-    for _ in range(RETRIES):
-        _throttle()
-        r = requests.get(url, headers=headers, params=params, timeout=20)
+    session = _get_session()
+    err: Exception = RuntimeError("API error: no attempts made")
+    for attempt in range(RETRIES):
+        metrics.count("api", "throttle_sleep_sec", _throttle())
+        if attempt:
+            metrics.count("api", "retries")
+        metrics.count("http", path)
+        try:
+            with metrics.timer(f"http {path}"):
+                r = session.get(url, headers=headers, params=params, timeout=TIMEOUT)
+        except requests.RequestException as e:
+            err = e
+            _sleep(_backoff(attempt))
+            continue
         if r.status_code == 200:
-            return r.json()
-        time.sleep(2)
-    raise RuntimeError(f"API error {r.status_code}: {r.text}")
+            _observe(r.headers)
+            try:
+                data = r.json()
+            except ValueError:
+                # 200 sa HTML/praznim telom (proxy, prekinut odgovor): kao 5xx, ponovi
+                err = ApiError(r.status_code, f"invalid JSON: {r.text[:200]}")
+                _sleep(_backoff(attempt))
+                continue
+            errors = _body_errors(data)
+            if "requests" in errors:
+                quota.exhaust()
+                raise QuotaExceeded(r.status_code, str(errors["requests"]))
+            if "rateLimit" in errors:
+                err = ApiError(429, str(errors["rateLimit"]))
+                _bucket.pause(60 - time.time() % 60)
+                continue
+            return data
+        err = ApiError(r.status_code, r.text)
+        if r.status_code == 429:
+            _sleep(_backoff(attempt, r.headers.get("Retry-After")))
+        elif r.status_code >= 500:
+            _sleep(_backoff(attempt))
+        else:
+            # ostali 4xx se ne popravljaju ponavljanjem
+            raise err
+    if isinstance(err, ApiError):
+        raise err
+    raise RuntimeError(f"API error: {err}")
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _session_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=max(WORKERS, 1), thread_name_prefix="api")
+        return _pool
+
+def _safe_get(path: str, params: Optional[Dict[str, Any]]) -> Any:
+    try:
+        return get(path, params)
+    except Exception as e:
+        return e
+
+def get_many(calls: Iterable[Tuple[str, Optional[Dict[str, Any]]]]) -> List[Any]:
+    # rezultati u istom redosledu kao calls; neuspeli poziv vraća svoj exception
+    pool = _get_pool()
+    futures = [pool.submit(_safe_get, path, params) for path, params in calls]
+    return [f.result() for f in futures]
@@ -0,0 +1,271 @@
+# src/archive.py
+# istorija objavljenih legova i tiketa sa ishodom: append-only kolone (sirovi .bin nizovi
+# fiksne širine) po mesecima, čitaju se kao np.memmap pa upiti ne učitavaju sve odjednom
+#
+#   python -m src.archive --by market,odds_band --from 2025-08 --to 2026-05
+import argparse, fcntl, hashlib, json, os, threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from . import publish, settle
+from .util import DATA_DIR
+
+ARCHIVE_DIR = os.getenv("FF_ARCHIVE_DIR") or os.path.join(DATA_DIR, "archive")
+STATS_FEED = "stats.json"
+ODDS_BANDS = (1.0, 1.3, 1.5, 1.8, 2.2, 3.0, 5.0)  # donje granice opsega kvota
+
+RESULT_CODES = {settle.WON: 1, settle.LOST: 2, settle.VOIDED: 3}
+STATUS_CODES = {settle.PENDING: 0, **RESULT_CODES}
+
+# kolone po tabeli; stringovi (market, pick, feed) idu kroz rečnik u dict.json
+SCHEMA: Dict[str, List[Tuple[str, str]]] = {
+    "legs": [
+        ("key", "<i8"), ("date", "<i4"), ("feed", "<i2"), ("ticket", "<i2"),
+        ("fixture_id", "<i8"), ("league_id", "<i4"), ("market", "<i2"), ("pick", "<i2"),
+        ("odds", "<f4"), ("prob", "<f4"), ("result", "<i1"),
+    ],
+    "tickets": [
+        ("key", "<i8"), ("date", "<i4"), ("feed", "<i2"), ("ticket", "<i2"), ("legs", "<i1"),
+        ("total_odds", "<f4"), ("settled_odds", "<f4"), ("status", "<i1"),
+    ],
+}
+DICTS = ("feed", "market", "pick")
+
+_lock = threading.Lock()
+_dicts: Optional[Dict[str, List[str]]] = None
+
+@contextmanager
+def _exclusive():
+    # backfill piše iz više procesa: jedan pisac u isto vreme, pa rečnik i kolone ostaju usklađeni
+    global _dicts
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    with _lock, open(os.path.join(ARCHIVE_DIR, ".lock"), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            _dicts = None  # drugi proces je možda dodao kodove
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _key(*parts: Any) -> int:
+    digest = hashlib.blake2b("|".join(str(p) for p in parts).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+def _load_dicts() -> Dict[str, List[str]]:
+    global _dicts
+    if _dicts is None:
+        try:
+            with open(os.path.join(ARCHIVE_DIR, "dict.json"), "r", encoding="utf-8") as f:
+                _dicts = json.load(f)
+        except (OSError, ValueError):
+            _dicts = {}
+        for name in DICTS:
+            _dicts.setdefault(name, [])
+    return _dicts
+
+def _code(name: str, value: str) -> int:
+    values = _load_dicts()[name]
+    try:
+        return values.index(value)
+    except ValueError:
+        values.append(value)
+        return len(values) - 1
+
+def _save_dicts() -> None:
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    publish._atomic_write(os.path.join(ARCHIVE_DIR, "dict.json"), json.dumps(_load_dicts()).encode("utf-8"))
+
+def _partition(table: str, month: str) -> str:
+    return os.path.join(ARCHIVE_DIR, table, month)
+
+def _columns(path: str, table: str) -> Dict[str, np.ndarray]:
+    # prekinut append ostavlja kolone različite dužine: važi najkraća
+    sizes = {}
+    for name, dtype in SCHEMA[table]:
+        fp = os.path.join(path, f"{name}.bin")
+        sizes[name] = os.path.getsize(fp) // np.dtype(dtype).itemsize if os.path.exists(fp) else 0
+    rows = min(sizes.values())
+    if not rows:
+        return {name: np.empty(0, dtype) for name, dtype in SCHEMA[table]}
+    return {
+        name: np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode="r", shape=(rows,))
+        for name, dtype in SCHEMA[table]
+    }
+
+def _append(table: str, month: str, rows: List[Dict[str, Any]]) -> int:
+    path = _partition(table, month)
+    os.makedirs(path, exist_ok=True)
+    existing = _columns(path, table)
+    keys = np.array([r["key"] for r in rows], dtype="<i8")
+    fresh = ~np.isin(keys, existing["key"])
+    # isti ključ dva puta u jednom pozivu (isti leg u dva prolaza) upisuje se jednom
+    _, first = np.unique(keys, return_index=True)
+    once = np.zeros(len(rows), dtype=bool)
+    once[first] = True
+    rows = [r for r, keep in zip(rows, fresh & once) if keep]
+    if not rows:
+        return 0
+    n = len(existing["key"])
+    for name, dtype in SCHEMA[table]:
+        fp = os.path.join(path, f"{name}.bin")
+        with open(fp, "r+b" if os.path.exists(fp) else "wb") as f:
+            f.truncate(n * np.dtype(dtype).itemsize)  # odseci ostatak prekinutog appenda
+            f.seek(0, os.SEEK_END)
+            f.write(np.array([r[name] for r in rows], dtype=dtype).tobytes())
+    return len(rows)
+
+def _date_int(date: str) -> int:
+    return int(date.replace("-", ""))
+
+def record(feed: str, doc: Dict[str, Any]) -> Dict[str, int]:
+    # upisuje samo obračunate legove i tikete; ključ (dan, feed, tiket, meč, market, pick)
+    # čini upis idempotentnim, pa evaluate može da zove ovo na svakom prolazu
+    date = doc.get("date")
+    if not date:
+        return {"legs": 0, "tickets": 0}
+    feed = feed[:-len(".json")] if feed.endswith(".json") else feed
+    legs: List[Dict[str, Any]] = []
+    tickets: List[Dict[str, Any]] = []
+    with _exclusive():
+        groups: List[Tuple[int, Iterable[Dict[str, Any]]]] = [(-1, doc.get("legs", []))]
+        for t_idx, t in enumerate(doc.get("tickets", [])):
+            groups.append((t_idx, t.get("legs", [])))
+            if t.get("status") in settle.SETTLED:
+                tickets.append({
+                    "key": _key(date, feed, t_idx), "date": _date_int(date), "feed": _code("feed", feed),
+                    "ticket": t_idx, "legs": len(t.get("legs", [])),
+                    "total_odds": float(t.get("total_odds") or 0), "status": STATUS_CODES[t["status"]],
+                    "settled_odds": float(t.get("settled_odds", t.get("total_odds")) or 0),
+                })
+        for t_idx, group in groups:
+            for leg in group:
+                if leg.get("market") == "ANALYSIS" or leg.get("result") not in RESULT_CODES:
+                    continue
+                legs.append({
+                    "key": _key(date, feed, t_idx, leg["fixture_id"], leg["market"], leg["pick"]),
+                    "date": _date_int(date), "feed": _code("feed", feed), "ticket": t_idx,
+                    "fixture_id": int(leg["fixture_id"]), "league_id": int(leg.get("league_id") or 0),
+                    "market": _code("market", leg["market"]), "pick": _code("pick", leg["pick"]),
+                    "odds": float(leg.get("odds") or 0), "prob": float(leg.get("prob") or 0),
+                    "result": RESULT_CODES[leg["result"]],
+                })
+        if not legs and not tickets:
+            return {"legs": 0, "tickets": 0}
+        _save_dicts()
+        month = date[:7]
+        return {
+            "legs": _append("legs", month, legs) if legs else 0,
+            "tickets": _append("tickets", month, tickets) if tickets else 0,
+        }
+
+def months(table: str = "legs") -> List[str]:
+    root = os.path.join(ARCHIVE_DIR, table)
+    return sorted(os.listdir(root)) if os.path.isdir(root) else []
+
+def scan(table: str = "legs", start: str = None, end: str = None) -> Iterator[Tuple[str, Dict[str, np.ndarray]]]:
+    # (mesec, kolone) za svaku particiju u [start, end]; kolone su memmap
+    for month in months(table):
+        if (start and month < start) or (end and month > end):
+            continue
+        cols = _columns(_partition(table, month), table)
+        if len(cols["key"]):
+            yield month, cols
+
+def _group_columns(table: str, month: str, cols: Dict[str, np.ndarray], by: Sequence[str]) -> List[np.ndarray]:
+    out = []
+    for name in by:
+        if name == "month":
+            out.append(np.full(len(cols["key"]), int(month.replace("-", "")), dtype="<i8"))
+        elif name == "odds_band":
+            # f4 1.30 je 1.2999..., pa se vraća na dve decimale pre poređenja sa granicama
+            price = np.round(np.asarray(cols["odds"] if table == "legs" else cols["total_odds"], dtype=np.float64), 2)
+            out.append(np.searchsorted(np.asarray(ODDS_BANDS), price, side="right").astype("<i8") - 1)
+        else:
+            out.append(cols[name].astype("<i8"))
+    return out
+
+def _label(name: str, code: int) -> Any:
+    if name in DICTS:
+        values = _load_dicts()[name]
+        return values[code] if 0 <= code < len(values) else code
+    if name == "odds_band":
+        lo = ODDS_BANDS[max(code, 0)]
+        hi = ODDS_BANDS[code + 1] if code + 1 < len(ODDS_BANDS) else None
+        return f"{lo:.2f}-{hi:.2f}" if hi else f"{lo:.2f}+"
+    if name == "month":
+        return f"{code // 100:04d}-{code % 100:02d}"
+    return code
+
+def stats(by: Sequence[str] = ("market",), table: str = "legs", start: str = None, end: str = None,
+          **filters: Any) -> List[Dict[str, Any]]:
+    # pogodak, ROI i prosečna kvota po grupi; particija po particija, bez učitavanja svega
+    outcome = "result" if table == "legs" else "status"
+    price_col = "odds" if table == "legs" else "settled_odds"
+    acc: Dict[Tuple, np.ndarray] = {}
+    for month, cols in scan(table, start, end):
+        mask = np.ones(len(cols["key"]), dtype=bool)
+        for name, value in filters.items():
+            code = _load_dicts()[name].index(value) if name in DICTS and value in _load_dicts()[name] else value
+            mask &= cols[name] == code
+        if not mask.any():
+            continue
+        keys = [c[mask] for c in _group_columns(table, month, cols, by)]
+        res = np.asarray(cols[outcome])[mask]
+        price = np.asarray(cols[price_col], dtype=np.float64)[mask]
+        if keys:
+            uniq, inverse = np.unique(np.stack(keys, axis=1), axis=0, return_inverse=True)
+            inverse = inverse.reshape(-1)
+        else:
+            uniq, inverse = np.zeros((1, 0), dtype="<i8"), np.zeros(len(res), dtype=np.intp)
+        won, lost, void = res == 1, res == 2, res == 3
+        parts = np.stack([
+            np.bincount(inverse, weights=won, minlength=len(uniq)),
+            np.bincount(inverse, weights=lost, minlength=len(uniq)),
+            np.bincount(inverse, weights=void, minlength=len(uniq)),
+            np.bincount(inverse, weights=np.where(won, price, 0.0), minlength=len(uniq)),
+            np.bincount(inverse, weights=np.where(void, 0.0, price), minlength=len(uniq)),
+        ], axis=1)
+        for k, row in zip(map(tuple, uniq.tolist()), parts):
+            acc[k] = acc[k] + row if k in acc else row
+    out = []
+    for k, row in sorted(acc.items()):
+        won, lost, void, returns, staked_odds = (float(x) for x in row)
+        played = won + lost
+        out.append({
+            **{name: _label(name, code) for name, code in zip(by, k)},
+            "settled": int(played + void),
+            "won": int(won),
+            "lost": int(lost),
+            "void": int(void),
+            "hit_rate": round(won / played, 4) if played else None,
+            "avg_odds": round(staked_odds / played, 3) if played else None,
+            "roi": round((returns - played) / played, 4) if played else None,
+        })
+    return out
+
+def publish_stats(start: str = None) -> bool:
+    # unapred izračunat feed za sajt: pogodak po marketu, ligi, opsegu kvota i feedu
+    return publish.write(STATS_FEED, {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "from": start or (months()[0] if months() else None),
+        "legs": {
+            "by_market": stats(("market", "pick"), start=start),
+            "by_league": stats(("league_id",), start=start),
+            "by_odds_band": stats(("market", "odds_band"), start=start),
+            "by_month": stats(("month",), start=start),
+        },
+        "tickets": {
+            "by_feed": stats(("feed",), table="tickets", start=start),
+        },
+    })
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="agregati iz arhive obračunatih legova/tiketa")
+    ap.add_argument("--table", default="legs", choices=sorted(SCHEMA))
+    ap.add_argument("--by", default="market", help="kolone odvojene zarezom, npr. market,odds_band")
+    ap.add_argument("--from", dest="start", help="YYYY-MM")
+    ap.add_argument("--to", dest="end", help="YYYY-MM")
+    args = ap.parse_args()
+    by = [c for c in args.by.split(",") if c]
+    print(json.dumps(stats(by, args.table, args.start, args.end), ensure_ascii=False, indent=2))
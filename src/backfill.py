@@ -0,0 +1,139 @@
+# src/backfill.py
+# generate + evaluate za opseg datuma u pool-u procesa: jedan zajednički rate limiter,
+# isti SQLite keš, izlaz u public/<datum>/; dnevnik u .cache/ pa se prekinut posao nastavlja
+#
+#   python -m src.backfill 2026-10-01 2026-10-18 --procs 4
+import argparse, json, multiprocessing, os, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date as Date, datetime, timedelta, timezone
+from typing import Any, Dict, List
+from . import api, archive, publish
+from .util import STATE_DIR
+
+PROCS = int(os.getenv("BACKFILL_PROCS", "4"))
+JOURNAL_PATH = os.path.join(STATE_DIR, "backfill.json")
+
+GENERATED, DONE, FAILED = "generated", "done", "failed"
+
+def dates(start: str, end: str) -> List[str]:
+    d, last = Date.fromisoformat(start), Date.fromisoformat(end)
+    out = []
+    while d <= last:
+        out.append(d.isoformat())
+        d += timedelta(days=1)
+    return out
+
+def _load_journal() -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(JOURNAL_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_journal(journal: Dict[str, Dict[str, Any]]) -> None:
+    os.makedirs(STATE_DIR, exist_ok=True)
+    publish._atomic_write(JOURNAL_PATH, json.dumps(journal, indent=2, sort_keys=True).encode("utf-8"))
+
+def _init(bucket: api.TokenBucket) -> None:
+    api._bucket = bucket
+
+def _calls(snapshot: Dict[str, Any]) -> int:
+    return int(sum(snapshot.get("http", {}).values()))
+
+def _one(date: str, root: str, regenerate: bool, settle_too: bool) -> Dict[str, Any]:
+    # radi u procesu iz pool-a; vraća red za dnevnik
+    from . import evaluate, generate, metrics, quota
+    directory = os.path.join(root, date)
+    row: Dict[str, Any] = {"date": date, "generate_sec": 0.0, "evaluate_sec": 0.0, "api_calls": 0}
+    try:
+        if regenerate:
+            t0 = time.perf_counter()
+            log = generate.run(date, directory=directory)
+            row["generate_sec"] = round(time.perf_counter() - t0, 3)
+            row["api_calls"] += _calls(metrics.snapshot())
+            row["fixtures"] = log["plan"]["fixtures"]
+            if log["stream"]["quota_exceeded"]:
+                # generate je objavio partial feedove; dan ostaje za sledeći prolaz
+                row.update(status=FAILED, error=log["stream"]["error"], quota=True)
+                return row
+        row["status"] = GENERATED
+        if settle_too:
+            t0 = time.perf_counter()
+            summary = evaluate.run(directory, stats=False)
+            row["evaluate_sec"] = round(time.perf_counter() - t0, 3)
+            row["api_calls"] += _calls(metrics.snapshot())
+            row["pending"] = summary["pending"]
+            if not summary["pending"]:
+                row["status"] = DONE
+    except api.QuotaExceeded as e:
+        row.update(status=FAILED, error=str(e), quota=True)
+    except Exception as e:
+        row.update(status=FAILED, error=f"{type(e).__name__}: {e}")
+    finally:
+        quota.flush()
+    return row
+
+def run(start: str, end: str, procs: int = PROCS, root: str = None, force: bool = False,
+        settle_too: bool = True) -> List[Dict[str, Any]]:
+    root = root or publish.PUBLIC_DIR
+    journal = _load_journal()
+    todo = []
+    for d in dates(start, end):
+        state = journal.get(d, {}).get("status")
+        if state == DONE and not force:
+            continue
+        # već generisan dan se samo ponovo obračunava, da ne pregazi obračunate tikete
+        todo.append((d, force or state != GENERATED))
+    if not todo:
+        return []
+
+    # spawn: čisto stanje po procesu (bez nasleđene SQLite konekcije i niti)
+    ctx = multiprocessing.get_context("spawn")
+    bucket = api.SharedTokenBucket(api.RATE, api.BURST, ctx)
+    rows: List[Dict[str, Any]] = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(procs, 1), mp_context=ctx, initializer=_init, initargs=(bucket,)) as pool:
+        futures = {pool.submit(_one, d, root, regenerate, settle_too): d for d, regenerate in todo}
+        for fut in as_completed(futures):
+            row = fut.result()
+            row["finished_at"] = datetime.now(timezone.utc).isoformat()
+            journal[row["date"]] = row
+            _save_journal(journal)
+            rows.append(row)
+            print(_line(row), flush=True)
+            if row.get("quota"):
+                # kvota je potrošena za sve procese: ostatak ostaje za sledeći --resume
+                for f in futures:
+                    f.cancel()
+    wall = time.perf_counter() - started
+    if settle_too:
+        archive.publish_stats()
+        publish.flush()
+    done = [r for r in rows if r["status"] != FAILED]
+    print(
+        f"{len(done)}/{len(todo)} dates in {wall:.1f}s "
+        f"({len(done) / wall * 60 if wall else 0:.1f} dates/min, "
+        f"{sum(r['api_calls'] for r in rows)} API calls)",
+        flush=True,
+    )
+    return rows
+
+def _line(row: Dict[str, Any]) -> str:
+    busy = row["generate_sec"] + row["evaluate_sec"]
+    rate = f"{row['api_calls'] / busy:.1f} calls/s" if busy else "-"
+    tail = f" error={row['error']}" if row.get("error") else f" pending={row.get('pending', '-')}"
+    return (
+        f"{row['date']} {row['status']:<9} gen={row['generate_sec']:.2f}s eval={row['evaluate_sec']:.2f}s "
+        f"calls={row['api_calls']} ({rate}) fixtures={row.get('fixtures', '-')}{tail}"
+    )
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="generate + evaluate za opseg datuma")
+    ap.add_argument("start", help="YYYY-MM-DD")
+    ap.add_argument("end", nargs="?", help="YYYY-MM-DD, podrazumevano isto što i start")
+    ap.add_argument("--procs", type=int, default=PROCS)
+    ap.add_argument("--out", help="koren za <datum>/ direktorijume, podrazumevano public/")
+    ap.add_argument("--force", action="store_true", help="ponovo generiši i već završene dane")
+    ap.add_argument("--no-evaluate", action="store_true", help="samo generate")
+    args = ap.parse_args()
+    run(args.start, args.end or args.start, args.procs, args.out, args.force, not args.no_evaluate)
@@ -0,0 +1,274 @@
+# src/bench.py
+# offline merenje generate/evaluate: snimanje pravih odgovora u kasete, replay kroz
+# lokalni stand-in (stub.py) i sintetički scenariji 100 / 1k / 5k mečeva
+#
+#   python -m src.bench synthetic --sizes 100,1000,5000 --bookmakers 20
+#   python -m src.bench record 2026-10-18 --name morning      (pravi ključ, pravi API)
+#   python -m src.bench replay bench/cassettes/morning.json.gz
+import argparse, gzip, hashlib, json, os, resource, subprocess, sys, tempfile, threading, time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+from .stub import StubState, serve
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+CASSETTE_DIR = os.path.join(ROOT, "bench", "cassettes")
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+CASSETTE_VERSION = 1
+SYNTHETIC_DATE = "2026-01-15"  # prošao dan: evaluate ima šta da obračuna, a seme je stabilno
+
+# ------------------------------------------------------------------
+# KASETE
+# ------------------------------------------------------------------
+def _query_key(params: Optional[Dict[str, Any]]) -> str:
+    return "&".join(f"{k}={params[k]}" for k in sorted(params or {}))
+
+def _body_key(body: Optional[Dict[str, Any]]) -> str:
+    # OpenAI zahtev se prepoznaje po modelu i promptu, ključ se ne snima
+    raw = json.dumps({"model": (body or {}).get("model"), "input": (body or {}).get("input")}, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class Tape:
+    def __init__(self, date: str):
+        self.date = date
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(method: str, path: str, params: Optional[Dict[str, Any]], body: Optional[Dict[str, Any]]) -> str:
+        if method == "POST":
+            return f"POST {path} {_body_key(body)}"
+        return f"{method} {path}?{_query_key(params)}"
+
+    def add(self, method: str, path: str, params, body, payload: Any) -> None:
+        with self._lock:
+            # ponovljen zahtev (revalidate) prepisuje raniji, replay vraća poslednje stanje
+            self.entries[self.key(method, path, params, body)] = payload
+
+    def save(self, fp: str) -> None:
+        os.makedirs(os.path.dirname(fp) or ".", exist_ok=True)
+        doc = {
+            "version": CASSETTE_VERSION,
+            "date": self.date,
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "entries": self.entries,
+        }
+        with gzip.open(fp, "wt", encoding="utf-8") as f:
+            json.dump(doc, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, fp: str) -> "Tape":
+        with gzip.open(fp, "rt", encoding="utf-8") as f:
+            doc = json.load(f)
+        if doc.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"{fp}: cassette version {doc.get('version')}, expected {CASSETTE_VERSION}")
+        tape = cls(doc["date"])
+        tape.entries = doc["entries"]
+        return tape
+
+def recording_session(tape: Tape):
+    import requests
+
+    class RecordingSession(requests.Session):
+        def request(self, method, url, params=None, json=None, **kwargs):
+            resp = super().request(method, url, params=params, json=json, **kwargs)
+            if resp.status_code == 200:
+                try:
+                    tape.add(method.upper(), urlparse(url).path, params, json, resp.json())
+                except ValueError:
+                    pass
+            return resp
+
+    return RecordingSession()
+
+class CassetteState(StubState):
+    # stub koji odgovara iz kasete; nesnimljen zahtev je prazan odgovor i broji se kao promašaj
+    def __init__(self, tape: Tape, latency: float = 0.0):
+        super().__init__(fixtures=0, latency=latency)
+        self.tape = tape
+        self.misses = 0
+
+    def handle(self, path: str, q: Dict[str, str]) -> Dict[str, Any]:
+        payload = self.tape.entries.get(Tape.key("GET", path, q, None))
+        if payload is None:
+            self.misses += 1
+            return {"response": [], "results": 0}
+        return payload
+
+    def post(self, path: str, req: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        payload = self.tape.entries.get(Tape.key("POST", path, None, req))
+        if payload is None:
+            self.misses += 1
+            return super().post(path, req)
+        with self._lock:
+            self.calls[path] = self.calls.get(path, 0) + 1
+        return payload
+
+# ------------------------------------------------------------------
+# MERENJE (izvršava se u posebnom procesu, sa svojim .cache/ i public/)
+# ------------------------------------------------------------------
+def _phase(name: str, fn: Callable[[], Any], state: StubState) -> Dict[str, Any]:
+    # generate.run i evaluate.run same resetuju metrics, pa snapshot posle poziva pripada fazi
+    from . import metrics, odds
+    calls_before = dict(state.calls)
+    hits, misses = odds.STATS["hits"], odds.STATS["misses"]
+    t0 = time.perf_counter()
+    fn()
+    wall = time.perf_counter() - t0
+    hits, misses = odds.STATS["hits"] - hits, odds.STATS["misses"] - misses
+    snap = metrics.snapshot()
+    calls = {p: n - calls_before.get(p, 0) for p, n in state.calls.items() if n - calls_before.get(p, 0)}
+    return {
+        "phase": name,
+        "wall_sec": round(wall, 4),
+        "stages": snap.pop("stages"),
+        "metrics": snap,
+        "api_calls": calls,
+        "cache_hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+    }
+
+def scenario(state: StubState, date: str, rate: float = 1000.0, burst: int = 50) -> Dict[str, Any]:
+    from . import api, evaluate, generate, quota
+    from .builders import single_analysis
+    server, url = serve(state)
+    api.API_BASE, api.API_KEY = url, "bench"
+    if rate:
+        api._bucket = api.TokenBucket(rate, burst)
+    single_analysis.OPENAI_URL, single_analysis.OPENAI_API_KEY = f"{url}/v1/responses", "bench"
+    single_analysis.AI_PROVIDER = "openai"
+    phases = [
+        _phase("generate_cold", lambda: generate.run(date), state),
+        _phase("generate_warm", lambda: generate.run(date), state),
+        _phase("evaluate", evaluate.run, state),
+    ]
+    server.shutdown()
+    quota.flush()
+    return {
+        "date": date,
+        "phases": phases,
+        "wall_sec": round(sum(p["wall_sec"] for p in phases), 4),
+        "api_calls": sum(sum(p["api_calls"].values()) for p in phases),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+def _child(args: argparse.Namespace) -> None:
+    if args.cassette:
+        state: StubState = CassetteState(Tape.load(args.cassette), args.latency)
+        date = state.tape.date
+    else:
+        state = StubState(args.fixtures, args.bookmakers, args.latency)
+        date = args.date
+    result = scenario(state, date, args.rate)
+    if isinstance(state, CassetteState):
+        result["cassette_misses"] = state.misses
+    print(json.dumps(result))
+
+def _spawn(extra: List[str]) -> Dict[str, Any]:
+    # svaki scenario u svom procesu: čist keš, čist public/ i pošten peak RSS
+    with tempfile.TemporaryDirectory(prefix="ff-bench-") as tmp:
+        env = {
+            **os.environ,
+            "FF_STATE_DIR": os.path.join(tmp, "state"),
+            "FF_PUBLIC_DIR": os.path.join(tmp, "public"),
+        }
+        out = subprocess.run(
+            [sys.executable, "-m", "src.bench", "_child", *extra],
+            cwd=ROOT, env=env, check=True, stdout=subprocess.PIPE, text=True,
+        ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _save(kind: str, runs: List[Dict[str, Any]], out: Optional[str]) -> str:
+    rev = _git_rev()
+    doc = {
+        "kind": kind,
+        "commit": rev,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "runs": runs,
+    }
+    fp = out or os.path.join(RESULTS_DIR, f"{kind}-{rev or 'worktree'}-{int(time.time())}.json")
+    os.makedirs(os.path.dirname(fp) or ".", exist_ok=True)
+    with open(fp, "w", encoding="utf-8") as f:
+        json.dump(doc, f, ensure_ascii=False, indent=2)
+    return fp
+
+def _summary(run: Dict[str, Any]) -> str:
+    phases = " ".join(f"{p['phase']}={p['wall_sec']}s" for p in run["phases"])
+    return f"wall={run['wall_sec']}s calls={run['api_calls']} rss={run['peak_rss_mb']}MB {phases}"
+
+def record(date: str, name: str) -> str:
+    # pravi API i pravi OpenAI, u praznom stanju da bi svaki odgovor prošao kroz kasetu
+    tmp = tempfile.mkdtemp(prefix="ff-record-")
+    os.environ["FF_STATE_DIR"] = os.path.join(tmp, "state")
+    os.environ["FF_PUBLIC_DIR"] = os.path.join(tmp, "public")
+    from . import api, evaluate, generate
+    from .builders import single_analysis
+    tape = Tape(date)
+    api._session = recording_session(tape)
+    single_analysis._session = recording_session(tape)
+    generate.run(date)
+    evaluate.run()
+    fp = os.path.join(CASSETTE_DIR, f"{name}.json.gz")
+    tape.save(fp)
+    return fp
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="record/replay benchmark za generate i evaluate")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    syn = sub.add_parser("synthetic", help="sintetički dani preko stub servera")
+    syn.add_argument("--sizes", default="100,1000,5000")
+    syn.add_argument("--bookmakers", type=int, default=20)
+    syn.add_argument("--date", default=SYNTHETIC_DATE)
+    syn.add_argument("--latency", type=float, default=0.0)
+    syn.add_argument("--rate", type=float, default=1000.0, help="0 = produkcijski tempo iz api.py")
+    syn.add_argument("--out")
+
+    rec = sub.add_parser("record", help="snimi pravi dan u kasetu (troši kvotu)")
+    rec.add_argument("date")
+    rec.add_argument("--name")
+
+    rep = sub.add_parser("replay", help="pusti kasetu kroz stub server")
+    rep.add_argument("cassette")
+    rep.add_argument("--latency", type=float, default=0.0)
+    rep.add_argument("--rate", type=float, default=1000.0)
+    rep.add_argument("--out")
+
+    child = sub.add_parser("_child")
+    child.add_argument("--cassette")
+    child.add_argument("--fixtures", type=int, default=100)
+    child.add_argument("--bookmakers", type=int, default=20)
+    child.add_argument("--date", default=SYNTHETIC_DATE)
+    child.add_argument("--latency", type=float, default=0.0)
+    child.add_argument("--rate", type=float, default=1000.0)
+
+    args = ap.parse_args(argv)
+    if args.cmd == "_child":
+        _child(args)
+    elif args.cmd == "record":
+        print(record(args.date, args.name or args.date))
+    elif args.cmd == "synthetic":
+        runs = []
+        for n in (int(x) for x in args.sizes.split(",") if x):
+            run = _spawn(["--fixtures", str(n), "--bookmakers", str(args.bookmakers), "--date", args.date,
+                          "--latency", str(args.latency), "--rate", str(args.rate)])
+            run.update(fixtures=n, bookmakers=args.bookmakers)
+            print(f"{n:>6} fixtures: {_summary(run)}")
+            runs.append(run)
+        print(_save("synthetic", runs, args.out))
+    else:
+        run = _spawn(["--cassette", os.path.abspath(args.cassette),
+                      "--latency", str(args.latency), "--rate", str(args.rate)])
+        run["cassette"] = os.path.basename(args.cassette)
+        print(f"{run['cassette']}: {_summary(run)} misses={run['cassette_misses']}")
+        print(_save("replay", [run], args.out))
+
+if __name__ == "__main__":
+    main()
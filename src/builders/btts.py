@@ -1,43 +1,28 @@
 from typing import List, Dict, Any
-from ..odds import fixtures_by_date, odds_by_fixture
+from .. import model
+from ..snapshots import drifted
 
 MIN_ODD = 1.20  # BTTS obično skuplji, malo viši prag
+NEEDS = ("odds",)  # šta plan mora da dohvati pre legs_for()
 
-def _best_btts_yes(odds: Dict[str, Any]):
-    best_odd = 0.0
-    for b in odds.get("bookmakers", []):
-        for m in b.get("bets", []):
-            if m.get("name") not in ("Both Teams Score", "Both Teams To Score"):
-                continue
-            for v in m.get("values", []):
-                if v.get("value") != "Yes":
-                    continue
-                try:
-                    odd = float(v.get("odd", "0"))
-                except Exception:
-                    continue
-                if odd >= MIN_ODD and odd > best_odd:
-                    best_odd = odd
-    if best_odd > 0:
-        return "BTTS Yes", best_odd
+def _best_btts_yes(markets: Dict[str, Any]):
+    price = markets.get("BTTS", {}).get("Yes")
+    if price and price["best"] >= MIN_ODD and not drifted(price):
+        return "BTTS Yes", price["best"]
     return None, None
 
-def build(date: str) -> List[Dict[str, Any]]:
-    legs: List[Dict[str, Any]] = []
-    fixtures = fixtures_by_date(date)
-    for f in fixtures:
-        fid = f["fixture"]["id"]
-        home = f["teams"]["home"]["name"]
-        away = f["teams"]["away"]["name"]
-        o = odds_by_fixture(fid)
-        pick, odd = _best_btts_yes(o)
-        if not pick:
-            continue
-        legs.append({
-            "fixture_id": fid,
-            "market": "BTTS",
-            "pick": pick,
-            "odds": round(odd, 2),
-            "label": f"{home} vs {away}",
-        })
-    return legs
+def legs_for(e: Dict[str, Any]) -> List[Dict[str, Any]]:
+    pick, odd = _best_btts_yes(e["markets"])
+    if not pick:
+        return []
+    return [{
+        "fixture_id": e["fixture_id"],
+        "kickoff": e["kickoff"],
+        "league_id": e["league_id"],
+        "market": "BTTS",
+        "pick": pick,
+        "odds": round(odd, 2),
+        "prob": round(model.prob(e["markets"]["BTTS"]["Yes"]), 4),
+        **model.edge(e["markets"]["BTTS"]["Yes"]),
+        "label": f"{e['home']} vs {e['away']}",
+    }]
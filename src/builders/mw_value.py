@@ -1,36 +1,41 @@
+import os
 from typing import List, Dict, Any
-from ..odds import fixtures_by_date, odds_by_fixture
+from .. import model
+from ..snapshots import drifted
 
-MIN_ODD = 1.70
-MAX_ODD = 2.50
+# vrednost = najbolja kvota iznad konsenzusa: EV = fer verovatnoća × najbolja kvota - 1
+MIN_EV = float(os.getenv("MW_MIN_EV", "0.03"))
+MIN_BOOKS = 5  # EV protiv dve-tri kladionice je šum
+MIN_ODD = 1.40  # samo zaštitna ograda, kriterijum je EV
+MAX_ODD = 6.00
+NEEDS = ("odds",)  # šta plan mora da dohvati pre legs_for()
 
-def build(date: str) -> List[Dict[str, Any]]:
-    legs = []
-    fixtures = fixtures_by_date(date)
-    for f in fixtures:
-        fid = f["fixture"]["id"]
-        home = f["teams"]["home"]["name"]
-        away = f["teams"]["away"]["name"]
-        odds = odds_by_fixture(fid)
-        best = None
-        best_odd = 0.0
-        for b in odds.get("bookmakers", []):
-            for m in b.get("bets", []):
-                if m.get("name") in ("Match Winner", "Matchwinner", "1x2"):
-                    for v in m.get("values", []):
-                        try:
-                            odd = float(v.get("odd", "0"))
-                        except ValueError:
-                            continue
-                        if MIN_ODD <= odd <= MAX_ODD and odd > best_odd:
-                            best = v.get("value")
-                            best_odd = odd
-        if best:
-            legs.append({
-                "fixture_id": fid,
-                "market": "MW",
-                "pick": best,
-                "odds": best_odd,
-                "label": f"{home} vs {away}"
-            })
-    return legs
+def _best_value(markets: Dict[str, Any]):
+    best = None
+    best_ev = MIN_EV
+    for val, price in markets.get("MW", {}).items():
+        ev = price.get("ev")
+        if ev is None or price["count"] < MIN_BOOKS or drifted(price):
+            continue
+        if MIN_ODD <= price["best"] <= MAX_ODD and ev >= best_ev:
+            best = val
+            best_ev = ev
+    return best
+
+def legs_for(e: Dict[str, Any]) -> List[Dict[str, Any]]:
+    best = _best_value(e["markets"])
+    if not best:
+        return []
+    price = e["markets"]["MW"][best]
+    return [{
+        "fixture_id": e["fixture_id"],
+        "kickoff": e["kickoff"],
+        "league_id": e["league_id"],
+        "market": "MW",
+        "pick": best,
+        "odds": price["best"],
+        "prob": round(model.prob(price), 4),
+        "ev": price["ev"],
+        **model.edge(price),
+        "label": f"{e['home']} vs {e['away']}"
+    }]
@@ -1,35 +1,26 @@
 from typing import List, Dict, Any
-from ..odds import fixtures_by_date, odds_by_fixture
+from .. import model
+from ..snapshots import drifted
 
 TARGET_LINES = ("Over 1.5", "Over 2.5")
+NEEDS = ("odds",)  # šta plan mora da dohvati pre legs_for()
 
-def build(date: str) -> List[Dict[str, Any]]:
+def legs_for(e: Dict[str, Any]) -> List[Dict[str, Any]]:
     legs = []
-    fixtures = fixtures_by_date(date)
-    for f in fixtures:
-        fid = f["fixture"]["id"]
-        home = f["teams"]["home"]["name"]
-        away = f["teams"]["away"]["name"]
-        odds = odds_by_fixture(fid)
-        pick = None
-        o = None
-        for b in odds.get("bookmakers", []):
-            for m in b.get("bets", []):
-                if m.get("name") == "Over/Under":
-                    for v in m.get("values", []):
-                        val = v.get("value")
-                        if val in TARGET_LINES:
-                            pick = val
-                            o = float(v.get("odd", "1.40"))
-                            break
-            if pick:
-                break
-        if pick:
-            legs.append({
-                "fixture_id": fid,
-                "market": "OU",
-                "pick": pick,
-                "odds": o,
-                "label": f"{home} vs {away}"
-            })
+    lines = e["markets"].get("OU", {})
+    for pick in TARGET_LINES:
+        price = lines.get(pick)
+        if not price or drifted(price):
+            continue
+        legs.append({
+            "fixture_id": e["fixture_id"],
+            "kickoff": e["kickoff"],
+            "league_id": e["league_id"],
+            "market": "OU",
+            "pick": pick,
+            "odds": round(price["best"], 2),
+            "prob": round(model.prob(price), 4),
+            **model.edge(price),
+            "label": f"{e['home']} vs {e['away']}"
+        })
     return legs
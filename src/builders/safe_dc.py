@@ -1,46 +1,41 @@
 from typing import List, Dict, Any
-from ..odds import fixtures_by_date, odds_by_fixture
+from .. import model
+from ..snapshots import drifted
 
 MIN_ODD = 1.10  # da ne uzme 1.00 ili prazno
+NEEDS = ("odds",)  # šta plan mora da dohvati pre legs_for()
 
-def _best_dc_from_odds(odds: Dict[str, Any]):
+def _best_dc_from_odds(markets: Dict[str, Any]):
+    # bez modela najviša kvota; kad ga ima, selekcija sa najvećim edge-om nad tržištem
     best = None
     best_odd = 0.0
-
-    for b in odds.get("bookmakers", []):
-        for m in b.get("bets", []):
-            if m.get("name") not in ("Double Chance", "Double chance"):
-                continue
-            for v in m.get("values", []):
-                val = v.get("value")
-                odd_str = v.get("odd", "")
-                try:
-                    odd = float(odd_str)
-                except Exception:
-                    continue
-                if odd >= MIN_ODD and odd > best_odd:
-                    best = val
-                    best_odd = odd
+    best_key = None
+    for val, price in markets.get("DC", {}).items():
+        odd = price["best"]
+        if odd < MIN_ODD or drifted(price):
+            continue
+        key = (price["edge"], odd) if "edge" in price else (odd,)
+        if best_key is None or key > best_key:
+            best = val
+            best_odd = odd
+            best_key = key
     if best:
         return best, best_odd
     return None, None
 
-def build(date: str) -> List[Dict[str, Any]]:
-    legs: List[Dict[str, Any]] = []
-    fixtures = fixtures_by_date(date)
-    for f in fixtures:
-        fid = f["fixture"]["id"]
-        home = f["teams"]["home"]["name"]
-        away = f["teams"]["away"]["name"]
-        o = odds_by_fixture(fid)
-        pick, odd = _best_dc_from_odds(o)
-        if not pick:
-            continue
-        legs.append({
-            "fixture_id": fid,
-            "market": "DC",
-            "pick": pick,
-            "odds": round(odd, 2),
-            "label": f"{home} vs {away}",
-        })
-    return legs
+def legs_for(e: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # jedan meč iz index-a (ili iz streama) -> njegove noge
+    pick, odd = _best_dc_from_odds(e["markets"])
+    if not pick:
+        return []
+    return [{
+        "fixture_id": e["fixture_id"],
+        "kickoff": e["kickoff"],
+        "league_id": e["league_id"],
+        "market": "DC",
+        "pick": pick,
+        "odds": round(odd, 2),
+        "prob": round(model.prob(e["markets"]["DC"][pick]), 4),
+        **model.edge(e["markets"]["DC"][pick]),
+        "label": f"{e['home']} vs {e['away']}",
+    }]
@@ -1,13 +1,20 @@
 # src/builders/single_analysis.py
 import os
 import json
+import bisect
+import hashlib
+import time
 import requests
-from typing import List, Dict, Any
-from ..odds import fixtures_by_date, odds_by_fixture
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Any
+from .. import cache, metrics, model, ttl
+from ..slim import Fixture
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-OPENAI_URL = "https://api.openai.com/v1/responses"
+OPENAI_URL = os.getenv("OPENAI_URL", "https://api.openai.com/v1/responses")
+AI_PROVIDER = os.getenv("AI_PROVIDER", "openai")  # openai | stub
+AI_CONCURRENCY = int(os.getenv("AI_CONCURRENCY", "3"))
 
 # dozvoljene lige + UEFA takmičenja (po API-Football ID-jevima)
 ALLOWED_COMPETITIONS = {
@@ -35,16 +42,62 @@ ALLOWED_COMPETITIONS = {
 
 MAX_FIXTURES = 5  # koliko analiza hoćemo dnevno
 
-def _make_prompt(fixture: Dict[str, Any], odds: Dict[str, Any]) -> str:
-    home = fixture["teams"]["home"]["name"]
-    away = fixture["teams"]["away"]["name"]
-    league = fixture["league"]["name"]
-    return (
+# manji broj = važnije takmičenje; ostale dozvoljene lige dobijaju DEFAULT_PRIORITY
+LEAGUE_PRIORITY = {
+    2: 0, 39: 0, 140: 0, 78: 0, 135: 0, 61: 0,
+    3: 1, 848: 1, 4: 1, 94: 1, 88: 1,
+    203: 2, 197: 2, 179: 2, 566: 2,
+}
+DEFAULT_PRIORITY = 3
+NEEDS = ("odds",)
+
+def wants(f: Fixture) -> bool:
+    return f.league_id in ALLOWED_COMPETITIONS
+
+def _make_prompt(entry: Dict[str, Any]) -> str:
+    home = entry["home"]
+    away = entry["away"]
+    league = entry["league_name"]
+    prompt = (
         f"Make an in-depth football match analysis for {home} vs {away} in {league}. "
         "Use only educational and analytical wording, do not recommend betting or staking. "
         "Focus on form, goals, BTTS tendency, over/under patterns, home/away strength. "
         "Return JSON with keys: title, summary, safest_markets (array of strings), observations (array of strings)."
     )
+    # uz ENRICH=1: očekivani golovi iz forme i međusobni mečevi kao podaci za analizu
+    m = entry.get("model")
+    if m:
+        prompt += f" Expected goals from season form: {home} {m['xg'][0]}, {away} {m['xg'][1]}."
+        h2h = m.get("h2h")
+        if h2h:
+            prompt += (
+                f" Last {h2h['played']} head-to-head games: {h2h['avg_goals']} goals per game, "
+                f"both teams scored in {h2h['btts']}."
+            )
+    return prompt
+
+def _rank(entry: Dict[str, Any]):
+    # prioritet lige, pa mečevi sa više kladionica/marketa, pa raniji početak
+    books = sum(
+        max((p["count"] for p in sels.values()), default=0)
+        for sels in entry["markets"].values()
+    )
+    return (
+        LEAGUE_PRIORITY.get(entry["league_id"], DEFAULT_PRIORITY),
+        -books,
+        entry.get("kickoff") or "",
+        entry["fixture_id"],
+    )
+
+def _call_stub(prompt: str) -> Any:
+    # offline provider: determinističan odgovor istog oblika kao OpenAI JSON
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    return {
+        "title": f"Stub analysis {digest}",
+        "summary": prompt[:120],
+        "safest_markets": ["Double Chance", "Over 1.5"],
+        "observations": ["stub provider, no model call"],
+    }
 
 def _call_openai(prompt: str) -> Any:
     if not OPENAI_API_KEY:
@@ -58,7 +111,12 @@ def _call_openai(prompt: str) -> Any:
         "input": prompt,
         "format": "json_object",
     }
-    resp = requests.post(OPENAI_URL, headers=headers, json=body, timeout=40)
+    metrics.count("http", "openai")
+    try:
+        with metrics.timer("http openai"):
+            resp = _session.post(OPENAI_URL, headers=headers, json=body, timeout=40)
+    except requests.RequestException as e:
+        return {"error": "openai_request_failed", "detail": str(e)}
     if resp.status_code != 200:
         return {"error": f"openai_http_{resp.status_code}", "detail": resp.text}
     data = resp.json()
@@ -71,39 +129,65 @@ def _call_openai(prompt: str) -> Any:
     except Exception:
         return {"error": "unexpected_openai_payload", "raw": data}
 
-def build(date: str) -> List[Dict[str, Any]]:
-    # 1. uzmi sve mečeve za danas
-    all_fixtures = fixtures_by_date(date)
-
-    # 2. filtriraj samo naše lige/UEFA
-    filtered = [
-        f for f in all_fixtures
-        if f["league"]["id"] in ALLOWED_COMPETITIONS
-    ]
-
-    # 3. uzmi samo prvih 5
-    fixtures = filtered[:MAX_FIXTURES]
-
-    legs: List[Dict[str, Any]] = []
-
-    for f in fixtures:
-        fid = f["fixture"]["id"]
-        home = f["teams"]["home"]["name"]
-        away = f["teams"]["away"]["name"]
-
-        odds = odds_by_fixture(fid)
-        prompt = _make_prompt(f, odds)
-        analysis_payload = _call_openai(prompt)
-
-        legs.append({
-            "fixture_id": fid,
-            "league_id": f["league"]["id"],
-            "league_name": f["league"]["name"],
-            "market": "ANALYSIS",
-            "pick": "AI_ANALYSIS",
-            "odds": 1.00,
-            "label": f"{home} vs {away}",
-            "analysis": analysis_payload
-        })
-
-    return legs
+_session = requests.Session()
+
+PROVIDERS: Dict[str, Callable[[str], Any]] = {
+    "openai": _call_openai,
+    "stub": _call_stub,
+}
+
+def register_provider(name: str, fn: Callable[[str], Any]) -> None:
+    PROVIDERS[name] = fn
+
+def _cache_key(entry: Dict[str, Any], prompt: str) -> str:
+    raw = f"{entry['fixture_id']}|{AI_PROVIDER}|{OPENAI_MODEL}|{prompt}"
+    return "ai_" + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:24]
+
+def _analyse(entry: Dict[str, Any]) -> Any:
+    prompt = _make_prompt(entry)
+    ck = _cache_key(entry, prompt)
+    cached = cache.get_entry(ck)
+    if cached is not None and time.time() - cached[0] <= ttl.for_analysis(entry["fixture_id"], cached[0]):
+        return cached[1]
+    payload = PROVIDERS[AI_PROVIDER](prompt)
+    # greške i nekonfigurisan ključ se ne keširaju, sledeći run pokušava ponovo
+    if isinstance(payload, dict) and not ({"error", "note"} & payload.keys()):
+        cache.set(ck, payload)
+    return payload
+
+class Shortlist:
+    # najbolje rangiranih MAX_FIXTURES mečeva dok index stiže deo po deo (stream);
+    # u memoriji je uvek najviše MAX_FIXTURES unosa
+    def __init__(self, size: int = MAX_FIXTURES):
+        self.size = size
+        self.entries: List[Dict[str, Any]] = []
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        if entry["league_id"] not in ALLOWED_COMPETITIONS:
+            return
+        bisect.insort(self.entries, entry, key=_rank)
+        del self.entries[self.size:]
+
+    def legs(self) -> List[Dict[str, Any]]:
+        # analize paralelno, redosled ostaje po rangu
+        with ThreadPoolExecutor(max_workers=max(AI_CONCURRENCY, 1)) as pool:
+            if model.ENABLED:
+                # h2h samo za shortlist: najviše MAX_FIXTURES poziva, pre prompta koji ga koristi
+                for e, h2h in zip(self.entries, pool.map(model.h2h, self.entries)):
+                    if h2h:
+                        e["model"]["h2h"] = h2h
+            payloads = list(pool.map(_analyse, self.entries))
+        return [
+            {
+                "fixture_id": e["fixture_id"],
+                "league_id": e["league_id"],
+                "league_name": e["league_name"],
+                "market": "ANALYSIS",
+                "pick": "AI_ANALYSIS",
+                "odds": 1.00,
+                "label": f"{e['home']} vs {e['away']}",
+                **({"model": e["model"]} if "model" in e else {}),
+                "analysis": analysis_payload
+            }
+            for e, analysis_payload in zip(self.entries, payloads)
+        ]
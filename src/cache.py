@@ -1,26 +1,168 @@
-import json, os, time
-from typing import Any, Optional
+import glob, json, os, sqlite3, threading, time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from . import metrics
+from .util import STATE_DIR
 
-CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "public")
+# keš više ne ide u public/ (to se objavljuje na Pages), već u .cache/
+CACHE_DIR = STATE_DIR
+LEGACY_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "public")
+BACKEND = os.getenv("CACHE_BACKEND", "sqlite")  # sqlite | json
+DB_PATH = os.path.join(CACHE_DIR, "cache.sqlite3")
+LRU_SIZE = int(os.getenv("CACHE_LRU_SIZE", "4096"))
+MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
 os.makedirs(CACHE_DIR, exist_ok=True)
 
-def _path(key: str) -> str:
-    return os.path.join(CACHE_DIR, f"{key}.cache.json")
+Entry = Tuple[float, Any, bool]  # (ts, value, negative)
 
-def get(key: str, max_age_sec: int = 1800) -> Optional[Any]:
-    fp = _path(key)
-    if not os.path.exists(fp):
-        return None
-    try:
-        with open(fp, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if time.time() - data["ts"] > max_age_sec:
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+class JsonFileBackend:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.cache.json")
+
+    def read(self, key: str) -> Optional[Entry]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data["ts"], data["value"], bool(data.get("neg"))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def write(self, key: str, ts: float, value: Any, negative: bool = False) -> None:
+        fp = self._path(key)
+        tmp = f"{fp}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(_dumps({"ts": ts, "value": value, "neg": negative}))
+        os.replace(tmp, fp)
+
+class SqliteBackend:
+    def __init__(self, path: str, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, ts REAL NOT NULL, size INTEGER NOT NULL, value TEXT NOT NULL,"
+            " neg INTEGER NOT NULL DEFAULT 0)"
+        )
+        cols = {row[1] for row in self._db.execute("PRAGMA table_info(entries)")}
+        if "neg" not in cols:
+            self._db.execute("ALTER TABLE entries ADD COLUMN neg INTEGER NOT NULL DEFAULT 0")
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_ts ON entries(ts)")
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def read(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            row = self._db.execute("SELECT ts, value, neg FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), bool(row[2])
+
+    def write(self, key: str, ts: float, value: Any, negative: bool = False) -> None:
+        raw = _dumps(value)
+        with self._lock:
+            # jedna transakcija: prekinut posao ne ostavlja polovičan unos
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                old = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (key, ts, size, value, neg) VALUES (?, ?, ?, ?, ?)",
+                    (key, ts, len(raw), raw, int(negative)),
+                )
+                self._size += len(raw) - (old[0] if old else 0)
+                if self._size > self.max_bytes:
+                    self._evict()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _evict(self) -> None:
+        # najstariji unosi prvi, dok ne spadnemo na 90% limita
+        target = self.max_bytes * 0.9
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY ts").fetchall():
+            if self._size <= target:
+                break
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._size -= size
+
+_lock = threading.Lock()
+_backend = None
+_lru: "OrderedDict[str, Entry]" = OrderedDict()
+
+def migrate_json(directory: str = LEGACY_DIR) -> int:
+    # stari *.cache.json fajlovi iz public/ prelaze u backend i brišu se
+    backend = _get_backend()
+    moved = 0
+    for fp in glob.glob(os.path.join(directory, "*.cache.json")):
+        key = os.path.basename(fp)[: -len(".cache.json")]
+        entry = JsonFileBackend(directory).read(key)
+        if entry is not None:
+            backend.write(key, *entry)
+            moved += 1
+        try:
+            os.remove(fp)
+        except FileNotFoundError:
+            pass
+    return moved
+
+def _get_backend():
+    global _backend
+    with _lock:
+        if _backend is not None:
+            return _backend
+        if BACKEND == "json":
+            _backend = JsonFileBackend(CACHE_DIR)
+        else:
+            _backend = SqliteBackend(DB_PATH, MAX_BYTES)
+    if glob.glob(os.path.join(LEGACY_DIR, "*.cache.json")):
+        migrate_json(LEGACY_DIR)
+    return _backend
+
+def _remember(key: str, entry: Entry) -> None:
+    with _lock:
+        _lru[key] = entry
+        _lru.move_to_end(key)
+        while len(_lru) > LRU_SIZE:
+            _lru.popitem(last=False)
+
+def get_entry(key: str) -> Optional[Entry]:
+    # (ts, value, negative) bez obzira na starost, za negativni keš i stale-while-revalidate
+    with _lock:
+        entry = _lru.get(key)
+        if entry is not None:
+            _lru.move_to_end(key)
+    if entry is None:
+        entry = _get_backend().read(key)
+        if entry is None:
+            metrics.count("cache", "misses")
             return None
-        return data["value"]
-    except Exception:
+        _remember(key, entry)
+        metrics.count("cache", "disk_hits")
+    else:
+        metrics.count("cache", "lru_hits")
+    if entry[2]:
+        metrics.count("cache", "negative_hits")
+    return entry
+
+def get(key: str, max_age_sec: int = 1800) -> Optional[Any]:
+    entry = get_entry(key)
+    if entry is None or time.time() - entry[0] > max_age_sec:
         return None
+    return entry[1]
+
+def set(key: str, value: Any, negative: bool = False) -> None:
+    entry = (time.time(), value, negative)
+    metrics.count("cache", "sets")
+    _get_backend().write(key, *entry)
+    _remember(key, entry)
 
-def set(key: str, value: Any) -> None:
-    fp = _path(key)
-    with open(fp, "w", encoding="utf-8") as f:
-        json.dump({"ts": time.time(), "value": value}, f, ensure_ascii=False, indent=2)
+if __name__ == "__main__":
+    print(f"migrated {migrate_json()} entries into {BACKEND} cache")
@@ -1,8 +1,7 @@
-from typing import List, Dict, Any
+import math
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 
-def pick_top(legs: List[Dict[str, Any]], n: int) -> List[Dict[str, Any]]:
-    legs_sorted = sorted(legs, key=lambda x: x.get("odds", 1.0))
-    return legs_sorted[:n]
+MAX_NODES = 200_000  # gornja granica za pretragu jednog tiketa
 
 def make_ticket(name: str, legs: List[Dict[str, Any]]) -> Dict[str, Any]:
     total_odds = 1.0
@@ -14,3 +13,119 @@ def make_ticket(name: str, legs: List[Dict[str, Any]]) -> Dict[str, Any]:
         "total_odds": round(total_odds, 2),
         "status": "pending"
     }
+
+def _prob(leg: Dict[str, Any]) -> float:
+    # "prob" je procena tržišta iz buildera; bez nje kvota sama sebe ocenjuje
+    p = leg.get("prob") or 1.0 / float(leg.get("odds", 1.0))
+    return min(max(p, 1e-6), 1.0)
+
+class Pool:
+    # pool se sortira i indeksira jednom, pa se iz njega pravi više tiketa
+    def __init__(self, legs: Iterable[Dict[str, Any]]):
+        rows = []
+        for leg in legs:
+            odds = float(leg.get("odds", 1.0))
+            if odds <= 1.0:
+                continue
+            logo = math.log(odds)
+            logp = math.log(_prob(leg))
+            # edge = log(p * kvota); sum(logp) = sum(edge) - sum(logo), pa je edge ključ za sortiranje
+            rows.append((logp + logo, logp, logo, leg))
+        rows.sort(key=lambda r: (-r[0], r[2], r[3].get("fixture_id", 0), r[3].get("market", ""), r[3].get("pick", "")))
+        self.legs = [r[3] for r in rows]
+        self.edge = [r[0] for r in rows]
+        self.logp = [r[1] for r in rows]
+        self.logo = [r[2] for r in rows]
+        self.fixture = [leg.get("fixture_id") for leg in self.legs]
+        self.league = [leg.get("league_id") for leg in self.legs]
+        self.edge_prefix = [0.0]  # samo pozitivni edge-evi, za gornju granicu
+        for e in self.edge:
+            self.edge_prefix.append(self.edge_prefix[-1] + max(e, 0.0))
+        self.min_logo = min(self.logo, default=0.0)
+        self.max_logo = max(self.logo, default=0.0)
+
+    def __len__(self) -> int:
+        return len(self.legs)
+
+    def search(
+        self,
+        legs: Tuple[int, int] = (2, 4),
+        min_total: float = 1.0,
+        max_total: Optional[float] = None,
+        max_per_league: Optional[int] = None,
+        exclude: Iterable[Any] = (),
+    ) -> List[Dict[str, Any]]:
+        # branch & bound: najveća verovatnoća prolaza za ukupnu kvotu u [min_total, max_total],
+        # najviše jedan leg po meču i max_per_league po ligi
+        lo_legs, hi_legs = legs
+        lo = math.log(min_total)
+        hi = math.log(max_total) if max_total else math.inf
+        excluded = set(exclude)
+        best: List[Any] = [-math.inf, None]
+        nodes = [0]
+        n = len(self.legs)
+        chosen: List[int] = []
+        used = set(excluded)
+        per_league: Dict[Any, int] = {}
+
+        prefix, min_logo = self.edge_prefix, self.min_logo
+
+        def bound(i: int, k: int, logp: float, logo: float) -> float:
+            # t novih legova donosi najviše zbir t najboljih edge-eva, a kvota mora da dobaci do lo
+            # i svaki leg košta bar min_logo
+            need = lo - logo
+            top = logp if k >= lo_legs and need <= 0 else -math.inf
+            base = prefix[i]
+            for t in range(lo_legs - k if lo_legs > k else 1, hi_legs - k + 1):
+                cost = t * min_logo
+                if need > cost:
+                    cost = need
+                end = i + t if i + t < n else n
+                value = logp + prefix[end] - base - cost
+                if value > top:
+                    top = value
+            return top
+
+        def dfs(i: int, logp: float, logo: float) -> None:
+            k = len(chosen)
+            if k >= lo_legs and lo <= logo <= hi and logp > best[0]:
+                best[0], best[1] = logp, list(chosen)
+            if k == hi_legs:
+                return
+            if logo + (hi_legs - k) * self.max_logo < lo:
+                return
+            for j in range(i, n):
+                nodes[0] += 1
+                if nodes[0] > MAX_NODES:
+                    return
+                if bound(j, k, logp, logo) <= best[0]:
+                    return  # sortirano po edge, dalje može samo gore
+                fid, league = self.fixture[j], self.league[j]
+                if fid in used or logo + self.logo[j] > hi:
+                    continue
+                if max_per_league and league is not None and per_league.get(league, 0) >= max_per_league:
+                    continue
+                chosen.append(j)
+                used.add(fid)
+                per_league[league] = per_league.get(league, 0) + 1
+                dfs(j + 1, logp + self.logp[j], logo + self.logo[j])
+                chosen.pop()
+                used.discard(fid)
+                per_league[league] -= 1
+
+        dfs(0, 0.0, 0.0)
+        if best[1] is None:
+            return []
+        return [self.legs[j] for j in sorted(best[1], key=lambda j: (self.fixture[j], j))]
+
+    def tickets(self, count: int = 1, **constraints: Any) -> List[List[Dict[str, Any]]]:
+        # više tiketa bez zajedničkih mečeva
+        out: List[List[Dict[str, Any]]] = []
+        exclude = set(constraints.pop("exclude", ()))
+        for _ in range(count):
+            legs = self.search(exclude=exclude, **constraints)
+            if not legs:
+                break
+            out.append(legs)
+            exclude.update(l.get("fixture_id") for l in legs)
+        return out
@@ -0,0 +1,79 @@
+# src/dag.py
+# inkrementalni generate: svaki čvor (index meča, noge buildera, pool, varijanta tiketa,
+# izlazni fajl) nosi hash svojih ulaza; ako je isti kao u prošlom run-u za taj dan, vrednost
+# se uzima iz stanja umesto da se računa, a fajl se ne piše ponovo
+import hashlib, json, os
+from typing import Any, Callable, Dict, List, Optional
+from . import metrics, publish
+from .util import STATE_DIR
+
+DAG_DIR = os.path.join(STATE_DIR, "dag")
+ENABLED = os.getenv("GENERATE_INCREMENTAL", "1") == "1"
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    return repr(value)
+
+def digest(*parts: Any) -> str:
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=_default)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest()
+
+def config(module: Any) -> str:
+    # podešavanja modula (konstante velikim slovima) ulaze u hash njegovih čvorova
+    return digest({k: v for k, v in vars(module).items() if k.isupper() and not callable(v)})
+
+class Graph:
+    # name -> {"h": hash ulaza, "v": vrednost}; stanje jednog dana u .cache/dag/<datum>.json
+    def __init__(self, date: str, scope: str = ""):
+        self.path = os.path.join(DAG_DIR, f"{date}{scope}.json")
+        self.prev: Dict[str, Dict[str, Any]] = {}
+        if ENABLED:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.prev = json.load(f)
+            except (OSError, ValueError):
+                pass
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"reused": 0, "computed": 0, "unchanged_files": 0}
+        self.written: List[str] = []
+        # format izlaza (PUBLISH_PRETTY, PUBLISH_COMPRESS) menja fajl i kad su ulazi isti
+        self.publish_cfg = config(publish)
+
+    def hash(self, name: str) -> Optional[str]:
+        node = self.nodes.get(name)
+        return node["h"] if node else None
+
+    def node(self, name: str, inputs: Any, compute: Callable[[], Any]) -> Any:
+        # inputs: hashevi zavisnosti i parametri; isti ulazi = ista vrednost kao prošli put
+        h = digest(inputs)
+        old = self.prev.get(name)
+        if old is not None and old["h"] == h:
+            self.stats["reused"] += 1
+            self.nodes[name] = old
+            return old["v"]
+        value = compute()
+        self.stats["computed"] += 1
+        self.nodes[name] = {"h": h, "v": value}
+        return value
+
+    def output(self, name: str, inputs: Any, build: Callable[[], Any], directory: str) -> bool:
+        # izlazni fajl: piše se samo kad su se ulazi promenili ili fajla nema
+        h = digest(inputs, directory, self.publish_cfg)
+        old = self.prev.get(f"file:{name}")
+        self.nodes[f"file:{name}"] = {"h": h, "v": None}
+        if old is not None and old["h"] == h and os.path.exists(os.path.join(directory, name)):
+            self.stats["unchanged_files"] += 1
+            return False
+        if not publish.write(name, build(), directory):
+            return False
+        self.written.append(name)
+        return True
+
+    def save(self) -> None:
+        # čuvaju se samo čvorovi ovog run-a: meč koji je ispao iz plana ne ostaje u stanju
+        if not ENABLED:
+            return
+        os.makedirs(DAG_DIR, exist_ok=True)
+        with metrics.timer("dag.save"):
+            publish._atomic_write(self.path, json.dumps(self.nodes, separators=(",", ":")).encode("utf-8"))
@@ -1,62 +1,73 @@
 # src/evaluate.py
-import json, os, random
+import json, os
 from datetime import datetime, timezone
+from . import archive, metrics, publish, settle
 
-PUBLIC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "public")
-os.makedirs(PUBLIC_DIR, exist_ok=True)
+PUBLIC_DIR = publish.PUBLIC_DIR
 
-def _read(name: str):
-    fp = os.path.join(PUBLIC_DIR, name)
+FILES = [
+    "2plus.json",
+    "2plusbtts.json",
+    "dc.json",
+    "over15.json",
+    "over25.json",
+    "vip3plus.json",
+    "vip4plus.json",
+    "vip3plusbtts.json",
+    "vip4plusbtts.json",
+    "vip3plusdc.json",
+    "vip4plusdc.json",
+    "vip3plusover15.json",
+    "vip4plusover15.json",
+    "vip3plusover25.json",
+    "vip4plusover25.json",
+]
+
+def _read(name: str, directory: str = None):
+    fp = os.path.join(directory or PUBLIC_DIR, name)
     if not os.path.exists(fp):
         return None
     with open(fp, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def _write(name: str, data):
-    fp = os.path.join(PUBLIC_DIR, name)
-    with open(fp, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-def _mark_leg(leg):
-    hit = random.choice([True, False])
-    leg["result"] = "✅" if hit else "❌"
-    return hit
-
-def _process_ticket_file(name: str):
-    data = _read(name)
-    if not data:
-        return
-    for t in data.get("tickets", []):
-        all_hit = True
-        for leg in t.get("legs", []):
-            ok = _mark_leg(leg)
-            if not ok:
-                all_hit = False
-        t["status"] = "✅" if all_hit else "❌"
-    data["evaluated_at"] = datetime.now(timezone.utc).isoformat()
-    _write(name, data)
+def _write(name: str, data, directory: str = None):
+    publish.write(name, data, directory or PUBLIC_DIR)
 
-def run():
-    FILES = [
-        "2plus.json",
-        "2plusbtts.json",
-        "dc.json",
-        "over15.json",
-        "over25.json",
-        "vip3plus.json",
-        "vip4plus.json",
-        "vip3plusbtts.json",
-        "vip4plusbtts.json",
-        "vip3plusdc.json",
-        "vip4plusdc.json",
-        "vip3plusover15.json",
-        "vip4plusover15.json",
-        "vip3plusover25.json",
-        "vip4plusover25.json",
-    ]
+def run(directory: str = None, stats: bool = True):
+    # directory: public/<datum>/ za backfill; stats=False kad stats.json objavljuje pozivalac
+    # svi fajlovi se čitaju jednom; pitamo samo za mečeve koji još nisu obračunati,
+    # pa se evaluate može vrteti na 15 minuta bez prepisivanja svega
+    metrics.reset()
+    out = directory or PUBLIC_DIR
+    docs = {fn: _read(fn, out) for fn in FILES}
+    fids = settle.unsettled_fixture_ids(docs.values())
+    with metrics.timer("results"):
+        results = settle.results_for(fids) if fids else {}
 
-    for fn in FILES:
-        _process_ticket_file(fn)
+    archived = 0
+    for fn, data in docs.items():
+        if not data:
+            continue
+        with metrics.timer("settle"):
+            before = json.dumps(data, sort_keys=True)
+            settle.settle_doc(data, results)
+            changed = json.dumps(data, sort_keys=True) != before
+        # arhiva je idempotentna po ključu, pa se i nepromenjen feed sme ponovo ponuditi
+        with metrics.timer("archive"):
+            archived += sum(archive.record(fn, data).values())
+        if not changed:
+            continue
+        data["evaluated_at"] = datetime.now(timezone.utc).isoformat()
+        _write(fn, data, out)
+    if archived and stats:
+        with metrics.timer("archive"):
+            archive.publish_stats()
+        publish.flush()
+    publish.flush(out)
+    metrics.dump_trace()
+    # koliko je legova i dalje otvoreno, bez obzira na to da li im je vreme
+    pending = settle.unsettled_fixture_ids(docs.values(), now=float("inf"))
+    return {"asked": len(fids), "results": len(results), "archived": archived, "pending": len(pending)}
 
 if __name__ == "__main__":
     run()
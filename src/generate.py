@@ -1,170 +1,473 @@
 # src/generate.py
-import json, os
+import argparse, glob, json, os, time
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timezone
 from .builders import safe_dc, btts, ou, mw_value, single_analysis
-from . import compose
-from .util import today_iso
+from . import compose, dag, journal, metrics, model, odds, plan, publish, quota, snapshots
+from .util import STATE_DIR, today_iso
 
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-PUBLIC_DIR = os.path.join(BASE_DIR, "public")
-os.makedirs(PUBLIC_DIR, exist_ok=True)
+# (fajl, pool, ciljana ukupna kvota "2+" / "3+" / "4+")
+VARIANTS = [
+    ("2plus", "dc_ou", 2.0),
+    ("2plusbtts", "btts", 2.0),
+    ("vip3plus", "general", 3.0),
+    ("vip4plus", "general", 4.0),
+    ("vip3plusbtts", "btts", 3.0),
+    ("vip4plusbtts", "btts", 4.0),
+    ("vip3plusdc", "dc", 3.0),
+    ("vip4plusdc", "dc", 4.0),
+    ("vip3plusover15", "over15", 3.0),
+    ("vip4plusover15", "over15", 4.0),
+    ("vip3plusover25", "over25", 3.0),
+    ("vip4plusover25", "over25", 4.0),
+]
+TICKET_LEGS = (2, 6)
+MAX_TOTAL_FACTOR = 1.5  # 3+ tiket ide najviše do 4.5
+MAX_PER_LEAGUE = int(os.getenv("MAX_PER_LEAGUE", "2"))
+TICKETS_PER_VARIANT = int(os.getenv("TICKETS_PER_VARIANT", "1"))
+DEADLINE = float(os.getenv("GENERATE_DEADLINE", "0"))  # sekundi; 0 = bez roka
+SHARD_DIR = os.getenv("SHARD_DIR") or os.path.join(STATE_DIR, "shards")  # pool-ovi shardova, <dir>/<datum>/
 
-def _write(name: str, data):
-    fp = os.path.join(PUBLIC_DIR, name)
-    with open(fp, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+# builderi koji prave noge po meču (legs_for), redom kojim idu u log
+LEG_BUILDERS = [("safe_dc", safe_dc), ("btts", btts), ("ou", ou), ("mw_value", mw_value)]
 
-def run(date: str = None):
-    date = date or today_iso()
-
-    # 1) prikupi sve pool-ove za danas
-    dc_legs = safe_dc.build(date)
-    btts_legs = btts.build(date)
-    ou_legs = ou.build(date)
-    mw_legs = mw_value.build(date)
+def _write(name: str, data, directory: str = None):
+    publish.write(name, data, directory or publish.PUBLIC_DIR)
 
-    # 2) AI analize (limitirano na 5 u single_analysis builderu)
+@metrics.profiled
+def run(date: str = None, dry_run: bool = False, directory: str = None, deadline: float = None,
+        resume: bool = False, shard: Tuple[int, int, str] = None, pool_dir: str = None):
+    # directory: kuda idu feedovi (backfill piše u public/<datum>/)
+    # deadline: sekunde od starta posle kojih se stream prekida i piše ono što je stiglo
+    # resume: nastavi poslednji prekinut run za dan (kvote koje je platio se ne traže ponovo)
+    # shard: (i, n, by) -> samo deo mečeva i pool nogu u pool_dir umesto feedova (vidi merge)
+    date = date or today_iso()
+    jr = journal.Journal(date, _scope(shard))
     try:
-        ai_legs = single_analysis.build(date)
-    except Exception as e:
-        ai_legs = [{"error": f"single_analysis_failed: {e}"}]
+        log = _run(date, dry_run, directory, deadline, resume, jr, shard, pool_dir)
+    except BaseException as e:
+        if jr.started:
+            jr.log(journal.FAILED, error=f"{type(e).__name__}: {e}")
+        raise
+    if jr.started:
+        jr.log(journal.DONE, partial=log["stream"]["partial"])
+    return log
 
-    # ------------------------------------------------------------------
-    # FREE VARIJANTE
-    # ------------------------------------------------------------------
-    # jedan osnovni tiket 2+ (mešani pool: dc + ou)
-    free_2plus = compose.make_ticket("2plus", compose.pick_top(dc_legs + ou_legs, 2))
-    _write("2plus.json", {
-        "date": date,
-        "tickets": [free_2plus]
-    })
+def _scope(shard: Tuple[int, int, str] = None) -> str:
+    return f".shard-{shard[0]}-of-{shard[1]}" if shard else ""
 
-    # BTTS free: samo lista
-    _write("2plusbtts.json", {
-        "date": date,
-        "tickets": [
-            compose.make_ticket("2plusbtts", compose.pick_top(btts_legs, 2))
-        ]
-    })
+def _shard_path(date: str, shard: Tuple[int, int, str], pool_dir: str = None) -> str:
+    return os.path.join(pool_dir or SHARD_DIR, date, f"shard-{shard[0]}-of-{shard[1]}.json")
 
-    # DC free: samo lista
-    _write("dc.json", {
-        "date": date,
-        "legs": dc_legs
-    })
+def _run(date: str, dry_run: bool, directory: str, deadline: float, resume: bool, jr: journal.Journal,
+         shard: Tuple[int, int, str] = None, pool_dir: str = None):
+    out = directory or publish.PUBLIC_DIR
+    started = time.perf_counter()
+    metrics.reset()
+    odds.reset_stats()
 
-    # OU free:
-    _write("over15.json", {
-        "date": date,
-        "legs": [l for l in ou_legs if l["pick"] == "Over 1.5"]
-    })
-    _write("over25.json", {
-        "date": date,
-        "legs": [l for l in ou_legs if l["pick"] == "Over 2.5"]
-    })
-
-    # AI free: samo prva analiza
-    first_ai = ai_legs[0:1] if isinstance(ai_legs, list) else []
-    _write("single_analysis.json", {
-        "date": date,
-        "legs": first_ai
-    })
-
-    # ------------------------------------------------------------------
-    # VIP VARIJANTE
-    # ------------------------------------------------------------------
-    # ideja: od svakog pool-a pravimo 3+ i 4+ varijantu, kako si napisao
+    # 0) plan: filteri i minimalan skup poziva. Spisak mečeva bez API-ja dolazi iz starog
+    # unosa u kešu (odds._cached); ako ni njega nema, pad ide u journal kao i svaki drugi
+    prev = journal.pending(date, jr.scope) if resume and not dry_run else None
+    try:
+        with metrics.timer("fixtures"):
+            all_fixtures = odds.fixtures_by_date(date)
+        with metrics.timer("plan"):
+            fetch_plan = plan.make(date, all_fixtures, shard)
+    except RuntimeError:
+        if not dry_run:
+            # lanac --resume ostaje ceo i kad run padne pre plana
+            jr.log(journal.START, fixtures=None, resumed_from=prev and prev["run"])
+        raise
+    if dry_run:
+        return fetch_plan
+    fixtures = fetch_plan.fixtures
+    jr.log(journal.START, fixtures=len(fixtures), resumed_from=prev and prev["run"])
+    with metrics.timer("extra"):
+        extra = plan.execute_extra(fetch_plan)
 
-    # 1) generalni pool (dc + btts + ou + mw) → za 3+ i 4+
-    general_pool = dc_legs + btts_legs + ou_legs + mw_legs
+    graph = dag.Graph(date, _scope(shard))
+    deadline = DEADLINE if deadline is None else deadline
+    # vremenski ograničen posao: posle roka nema novih poziva, feedovi se prave od onoga
+    # što je stiglo i označavaju kao partial
+    until = started + deadline if deadline else None
+    pool = _collect(fetch_plan, graph, until, prev, jr)
+    pool["odds_bulk"]["extra"] = extra
+    pool["stream"]["resumed_from"] = prev and prev["run"]
 
-    vip3_general = compose.make_ticket("vip3plus", compose.pick_top(general_pool, 3))
-    vip4_general = compose.make_ticket("vip4plus", compose.pick_top(general_pool, 4))
+    # zastareli unosi su već poslužili ovaj run, osvežavamo ih tek sad
+    with metrics.timer("revalidate"):
+        refreshed = odds.revalidate()
+    if shard:
+        # worker ne komponuje, ne zove AI i ne objavljuje: pool nogu, shortlist i movements
+        # svojih mečeva (od snimka pre ovog procesa, koji merge na drugoj mašini nema) idu
+        # u pool_dir, feedove pravi merge
+        path = _shard_path(date, shard, pool_dir)
+        movements = None
+        if snapshots.ENABLED:
+            with metrics.timer("movements"):
+                movements = snapshots.movements(date, fixtures=[f.id for f in fixtures])
+        pool.update(date=date, shard=list(shard), plan=fetch_plan.to_dict(), movements=movements,
+                    metrics={"wall_sec": round(time.perf_counter() - started, 4), **metrics.snapshot()})
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        publish._atomic_write(path, json.dumps(pool, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        log = {k: pool[k] for k in ("date", "shard", "plan", "stream", "odds_bulk")}
+        log.update(pool=path, dag=dict(graph.stats), cache={**odds.STATS, **refreshed},
+                   metrics=pool["metrics"])
+        jr.log(journal.WRITTEN, files=[path])
+        graph.save()
+        metrics.dump_trace()
+        return log
 
-    _write("vip3plus.json", {
-        "date": date,
-        "tickets": [vip3_general]
-    })
-    _write("vip4plus.json", {
-        "date": date,
-        "tickets": [vip4_general]
+    pool["ai"], pool["ai_error"] = _analyses(pool.pop("shortlist"))
+    log = _publish(date, pool, graph, out)
+    log.update({
+        "odds_bulk": pool["odds_bulk"],
+        "stream": pool["stream"],
+        "plan": fetch_plan.to_dict(),
+        "dag": dict(graph.stats),
+        "quota": {**quota.snapshot(), "skipped_fixtures": len(all_fixtures) - len(fixtures)},
+        "cache": {**odds.STATS, **refreshed},
+        "metrics": {"wall_sec": round(time.perf_counter() - started, 4), **metrics.snapshot()},
     })
+    _write("log.json", log, out)
+    jr.log(journal.WRITTEN, files=graph.written + ["log.json"])
+    graph.save()
+    publish.flush(out)
+    metrics.dump_trace()
+    return log
 
-    # 2) BTTS VIP
-    vip3_btts = compose.make_ticket("vip3plusbtts", compose.pick_top(btts_legs, 3))
-    vip4_btts = compose.make_ticket("vip4plusbtts", compose.pick_top(btts_legs, 4))
+def _collect(fetch_plan: plan.Plan, graph: dag.Graph, until: float, prev: Dict[str, Any],
+             jr: journal.Journal) -> Dict[str, Any]:
+    # 1) stream: kvote stižu u prozorima od STREAM_WINDOW mečeva i svaki builder
+    # odmah dobija svoje noge; ceo index nikad nije u memoriji. Noge po meču su čvorovi
+    # grafa: meč čiji se index nije promenio od prošlog run-a ne računa se ponovo.
+    # Svaka noga nosi ključ plan.order svog meča, pa se pool-ovi shardova spajaju
+    # u isti redosled koji bi dao jedan run
+    cfg = {name: dag.config(builder) for name, builder in LEG_BUILDERS}
+    if model.ENABLED:
+        # udeo modela menja prob nogu, a nije konstanta buildera
+        cfg = {name: [c, model.WEIGHT] for name, c in cfg.items()}
+    cfg["drift"] = snapshots.MAX_DRIFT
+    fixtures = fetch_plan.fixtures
+    bulk = {"mode": fetch_plan.mode, "calls": 0, "fixtures": 0, "saved": 0, "parallel": 0}
+    legs: Dict[str, List[Any]] = {name: [] for name, _ in LEG_BUILDERS}
+    nodes: Dict[str, List[Any]] = {name: [] for name, _ in LEG_BUILDERS}
+    shortlist = single_analysis.Shortlist()
+    order = {f.id: plan.order(f) for f in fixtures}
+    seen = 0
+    built: List[int] = []
+    reuse = prev[journal.FETCHED] | prev[journal.INDEXED] if prev else ()
+    with metrics.timer("stream"):
+        for entry in plan.stream(fetch_plan, stats=bulk, until=until, reuse=reuse, checkpoint=jr.ids):
+            seen += 1
+            fid = entry["fixture_id"]
+            key = order[fid]
+            built.append(fid)
+            h = dag.digest(entry)
+            for name, builder in LEG_BUILDERS:
+                with metrics.timer(f"build.{name}"):
+                    node = f"{name}:{fid}"
+                    value = graph.node(node, [h, cfg[name], cfg["drift"]], lambda: builder.legs_for(entry))
+                    legs[name].extend((key, l) for l in value)
+                    nodes[name].append((key, graph.hash(node)))
+            shortlist.add(entry)
+            if len(built) >= odds.STREAM_WINDOW:
+                jr.ids(journal.BUILT, built)
+                built = []
+    jr.ids(journal.BUILT, built)
+    # preskočen meč (API ga nije vratio ni posle retry-ja) takođe čini feedove nepotpunim
+    skipped = bulk.pop("skipped", 0)
+    partial = bulk.pop("cut", False) or bool(skipped)
+    error, quota_hit = bulk.pop("error", None), bulk.pop("quota", False)
+    # redosled kao u planu, da izlaz ne zavisi od toga koja je kvota pre stigla
+    for name in legs:
+        legs[name].sort(key=_key)
+        nodes[name].sort(key=_key)
 
-    _write("vip3plusbtts.json", {
-        "date": date,
-        "tickets": [vip3_btts]
-    })
-    _write("vip4plusbtts.json", {
-        "date": date,
-        "tickets": [vip4_btts]
-    })
+    # AI analize ne prave se ovde: shard šalje shortlist, a merge analizira samo globalni vrh
+    return {
+        "legs": legs,
+        "nodes": nodes,
+        "shortlist": shortlist.entries,
+        "odds_bulk": bulk,
+        "stream": {
+            "window": odds.STREAM_WINDOW, "fixtures": seen, "of": len(fixtures), "partial": partial,
+            "skipped": skipped, "error": error, "quota_exceeded": quota_hit, "resumed_from": None,
+        },
+    }
 
-    # 3) DC VIP
-    vip3_dc = compose.make_ticket("vip3plusdc", compose.pick_top(dc_legs, 3))
-    vip4_dc = compose.make_ticket("vip4plusdc", compose.pick_top(dc_legs, 4))
+def _key(pair):
+    return pair[0]
 
-    _write("vip3plusdc.json", {
-        "date": date,
-        "tickets": [vip3_dc]
-    })
-    _write("vip4plusdc.json", {   # ispravljeno ime
-        "date": date,
-        "tickets": [vip4_dc]
-    })
+def _analyses(entries: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    # 2) AI analize za najbolje rangiranih MAX_FIXTURES unosa; računaju se uvek jer
+    # greška ne sme da se zapamti, a uspešne analize su ionako u kešu
+    shortlist = single_analysis.Shortlist()
+    for entry in entries:
+        shortlist.add(entry)
+    try:
+        with metrics.timer("build.single_analysis"):
+            return shortlist.legs(), None
+    except Exception as e:
+        return [], f"single_analysis_failed: {e}"
 
-    # 4) OVER 1.5 / 2.5 VIP
+def _publish(date: str, pool: Dict[str, Any], graph: dag.Graph, out: str) -> Dict[str, Any]:
+    # pool iz _collect (jedan run) ili spojen iz shardova (merge): tiketi, liste, movements
+    dc_legs, btts_legs, ou_legs, mw_legs = ([l for _, l in pool["legs"][name]] for name, _ in LEG_BUILDERS)
+    pool_hash = {name: dag.digest([h for _, h in pool["nodes"][name]]) for name, _ in LEG_BUILDERS}
+    if pool["ai_error"]:
+        ai_legs = [{"error": pool["ai_error"]}]
+    else:
+        ai_legs = pool["ai"]
+    stamp = {"partial": True} if pool["stream"]["partial"] else {}
+
+    # ------------------------------------------------------------------
+    # POOL-OVI (sortiraju se i indeksiraju jednom, i to tek kad ih neka varijanta traži)
+    # ------------------------------------------------------------------
     over15_legs = [l for l in ou_legs if l["pick"] == "Over 1.5"]
     over25_legs = [l for l in ou_legs if l["pick"] == "Over 2.5"]
+    sources = {
+        "dc_ou": (("safe_dc", "ou"), lambda: dc_legs + ou_legs),
+        "general": (("safe_dc", "btts", "ou", "mw_value"), lambda: dc_legs + btts_legs + ou_legs + mw_legs),
+        "btts": (("btts",), lambda: btts_legs),
+        "dc": (("safe_dc",), lambda: dc_legs),
+        "over15": (("ou", "Over 1.5"), lambda: over15_legs),
+        "over25": (("ou", "Over 2.5"), lambda: over25_legs),
+    }
+    pools: Dict[str, compose.Pool] = {}
+
+    def pool_of(name: str) -> compose.Pool:
+        if name not in pools:
+            with metrics.timer("compose"):
+                pools[name] = compose.Pool(sources[name][1]())
+        return pools[name]
+
+    def pool_inputs(name: str) -> List[Any]:
+        return [pool_hash.get(src, src) for src in sources[name][0]]
 
-    vip3_over15 = compose.make_ticket("vip3plusover15", compose.pick_top(over15_legs, 3))
-    vip4_over15 = compose.make_ticket("vip4plusover15", compose.pick_top(over15_legs, 4))
-    vip3_over25 = compose.make_ticket("vip3plusover25", compose.pick_top(over25_legs, 3))
-    vip4_over25 = compose.make_ticket("vip4plusover25", compose.pick_top(over25_legs, 4))
+    # ------------------------------------------------------------------
+    # TIKETI (FREE + VIP)
+    # ------------------------------------------------------------------
+    ticket_counts = {}
+    compose_cfg = [dag.config(compose), TICKET_LEGS, MAX_TOTAL_FACTOR, MAX_PER_LEAGUE, TICKETS_PER_VARIANT]
+    for name, pool_name, target in VARIANTS:
+        def search(pool_name=pool_name, target=target):
+            with metrics.timer("compose"):
+                return pool_of(pool_name).tickets(
+                    TICKETS_PER_VARIANT,
+                    legs=TICKET_LEGS,
+                    min_total=target,
+                    max_total=target * MAX_TOTAL_FACTOR,
+                    max_per_league=MAX_PER_LEAGUE,
+                )
+        tickets = graph.node(f"tickets:{name}", [pool_inputs(pool_name), target, compose_cfg], search)
+        ticket_counts[name] = len(tickets)
+        graph.output(f"{name}.json", [graph.hash(f"tickets:{name}"), date, stamp], lambda: {
+            "date": date,
+            **stamp,
+            "tickets": [compose.make_ticket(name, legs) for legs in tickets]
+        }, out)
 
-    _write("vip3plusover15.json", {
+    # ------------------------------------------------------------------
+    # LISTE
+    # ------------------------------------------------------------------
+    # DC free: samo lista
+    graph.output("dc.json", [pool_inputs("dc"), date, stamp], lambda: {
         "date": date,
-        "tickets": [vip3_over15]
-    })
-    _write("vip4plusover15.json", {
+        **stamp,
+        "legs": dc_legs
+    }, out)
+
+    # OU free:
+    graph.output("over15.json", [pool_inputs("over15"), date, stamp], lambda: {
         "date": date,
-        "tickets": [vip4_over15]
-    })
-    _write("vip3plusover25.json", {
+        **stamp,
+        "legs": over15_legs
+    }, out)
+    graph.output("over25.json", [pool_inputs("over25"), date, stamp], lambda: {
         "date": date,
-        "tickets": [vip3_over25]
-    })
-    _write("vip4plusover25.json", {
+        **stamp,
+        "legs": over25_legs
+    }, out)
+
+    # AI free: samo prva analiza
+    first_ai = ai_legs[0:1] if isinstance(ai_legs, list) else []
+    ai_hash = dag.digest(ai_legs)
+    graph.output("single_analysis.json", [ai_hash, date, stamp], lambda: {
         "date": date,
-        "tickets": [vip4_over25]
-    })
+        **stamp,
+        "legs": first_ai
+    }, out)
 
     # 5) AI VIP (sve analize)
-    _write("vipsingle_analysis.json", {
+    graph.output("vipsingle_analysis.json", [ai_hash, date, stamp], lambda: {
         "date": date,
+        **stamp,
         "legs": ai_legs if isinstance(ai_legs, list) else []
-    })
+    }, out)
+
+    # kretanje kvota od prošlog run-a (delta feed) i drift od otvaranja
+    if snapshots.ENABLED:
+        with metrics.timer("movements"):
+            # merge objavljuje spojene movements shardova, jedan run računa iz skladišta
+            snapshots.publish_movements(date, out, pool.get("movements"))
 
     # ------------------------------------------------------------------
     # LOG
     # ------------------------------------------------------------------
-    _write("log.json", {
+    return {
         "date": date,
         "generated_at": datetime.now(timezone.utc).isoformat(),
         "counts": {
-            "free_2plus": 1,
-            "free_btts": 1,
+            "free_2plus": ticket_counts["2plus"],
+            "free_btts": ticket_counts["2plusbtts"],
             "dc_legs": len(dc_legs),
             "btts_legs": len(btts_legs),
             "ou_legs": len(ou_legs),
             "mw_legs": len(mw_legs),
             "ai_free": len(first_ai),
             "ai_vip": len(ai_legs) if isinstance(ai_legs, list) else 0,
-        }
+        },
+        "tickets": ticket_counts,
+    }
+
+def _load_shards(date: str, pool_dir: str = None) -> List[Dict[str, Any]]:
+    # svi shardovi jedne podele (isti n i by), svaki tačno jednom; inače merge ne sme da objavi
+    directory = os.path.join(pool_dir or SHARD_DIR, date)
+    shards: Dict[int, Dict[str, Any]] = {}
+    split = None
+    for name in sorted(glob.glob(os.path.join(directory, "shard-*-of-*.json"))):
+        with open(name, "r", encoding="utf-8") as f:
+            doc = json.load(f)
+        i, n, by = doc["shard"]
+        if split is None:
+            split = (n, by)
+        elif (n, by) != split:
+            raise RuntimeError(f"{directory}: shards from different splits {split} and {(n, by)}")
+        shards[i] = doc
+    if split is None:
+        raise RuntimeError(f"{directory}: no shard pools")
+    missing = sorted(set(range(split[0])) - shards.keys())
+    if missing:
+        raise RuntimeError(f"{directory}: missing shards {missing} of {split[0]}")
+    return [shards[i] for i in range(split[0])]
+
+@metrics.profiled
+def merge(date: str = None, pool_dir: str = None, directory: str = None) -> Dict[str, Any]:
+    # spaja pool-ove shardova i jednom komponuje i objavljuje; od API poziva samo AI (i h2h)
+    # za globalnih MAX_FIXTURES, pa je cena merge-a čitanje pool-ova + sortiranje nogu po
+    # ključu + tiketi (DAG ih pamti) + najviše MAX_FIXTURES analiza (keširane po promptu)
+    date = date or today_iso()
+    out = directory or publish.PUBLIC_DIR
+    started = time.perf_counter()
+    metrics.reset()
+    with metrics.timer("merge.load"):
+        shards = _load_shards(date, pool_dir)
+    # ključevi su iz JSON-a liste, a ne tuple: porede se isto
+    pool: Dict[str, Any] = {
+        "legs": {name: [] for name, _ in LEG_BUILDERS},
+        "nodes": {name: [] for name, _ in LEG_BUILDERS},
+    }
+    shortlist: List[Dict[str, Any]] = []
+    with metrics.timer("merge.sort"):
+        for s in shards:
+            for name, _ in LEG_BUILDERS:
+                pool["legs"][name].extend(s["legs"][name])
+                pool["nodes"][name].extend(s["nodes"][name])
+            shortlist.extend(s["shortlist"])
+        # mečevi su disjunktni po shardovima a sort je stabilan: isti redosled kao jedan run
+        for name, _ in LEG_BUILDERS:
+            pool["legs"][name].sort(key=_key)
+            pool["nodes"][name].sort(key=_key)
+    # AI jednom, samo za globalni vrh shortliste; shardovi nisu zvali model
+    pool["ai"], pool["ai_error"] = _analyses(shortlist)
+    if snapshots.ENABLED:
+        pool["movements"] = snapshots.merge_movements(date, [s["movements"] for s in shards if s["movements"]])
+    streams = [s["stream"] for s in shards]
+    pool["stream"] = {
+        "window": odds.STREAM_WINDOW,
+        "fixtures": sum(st["fixtures"] for st in streams),
+        "of": sum(st["of"] for st in streams),
+        "partial": any(st["partial"] for st in streams),
+        "skipped": sum(st.get("skipped", 0) for st in streams),
+        "error": next((st["error"] for st in streams if st["error"]), None),
+        "quota_exceeded": any(st["quota_exceeded"] for st in streams),
+        "resumed_from": None,
+    }
+    graph = dag.Graph(date, ".merge")
+    log = _publish(date, pool, graph, out)
+    n, by = shards[0]["shard"][1:]
+    log.update({
+        "stream": pool["stream"],
+        "shards": [
+            {"plan": s["plan"], "stream": s["stream"], "odds_bulk": s["odds_bulk"],
+             "wall_sec": s["metrics"]["wall_sec"]}
+            for s in shards
+        ],
+        "plan": {"date": date, "fixtures": pool["stream"]["of"], "shard": f"merge {n}:{by}"},
+        "dag": dict(graph.stats),
+        "metrics": {"wall_sec": round(time.perf_counter() - started, 4), **metrics.snapshot()},
     })
+    _write("log.json", log, out)
+    graph.save()
+    publish.flush(out)
+    metrics.dump_trace()
+    return log
+
+def _shard_arg(value: str) -> Tuple[int, int]:
+    i, _, n = value.partition("/")
+    try:
+        i, n = int(i), int(n)
+    except ValueError:
+        raise argparse.ArgumentTypeError("očekivano I/N, npr. 0/4")
+    if not 0 <= i < n:
+        raise argparse.ArgumentTypeError("I mora biti između 0 i N-1")
+    return i, n
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="Generiše dnevne feedove u public/")
+    parser.add_argument("date", nargs="?", help="YYYY-MM-DD, podrazumevano danas")
+    parser.add_argument("--dry-run", action="store_true", help="samo plan: broj poziva i procena trajanja")
+    parser.add_argument("--deadline", type=float, help="sekundi; posle toga feedovi od onoga što je stiglo (partial)")
+    parser.add_argument("--resume", action="store_true",
+                        help="nastavi poslednji prekinut run za dan, bez ponovnog plaćanja dohvaćenih kvota")
+    parser.add_argument("--watch", type=float, metavar="SEC",
+                        help="ponavljaj na svakih SEC sekundi; menjaju se samo feedovi čiji su se ulazi promenili")
+    parser.add_argument("--shard", type=_shard_arg, metavar="I/N",
+                        help="worker I od N: samo njegovi mečevi, pool nogu u --pool-dir umesto feedova")
+    parser.add_argument("--shard-by", choices=("league", "hash"), default=plan.SHARD_BY,
+                        help="podela mečeva: cele lige ili hash id-a meča")
+    parser.add_argument("--merge", action="store_true",
+                        help="spoji pool-ove svih shardova i objavi feedove (isti bajtovi kao jedan run)")
+    parser.add_argument("--pool-dir", help=f"direktorijum pool-ova shardova, podrazumevano {SHARD_DIR}")
+    args = parser.parse_args()
+    if args.watch:
+        # --watch je ponavljani pun run; shard/merge/resume/dry-run su jednokratni poslovi
+        clash = [flag for flag, on in (("--shard", args.shard), ("--pool-dir", args.pool_dir),
+                                       ("--merge", args.merge), ("--resume", args.resume),
+                                       ("--dry-run", args.dry_run)) if on]
+        if clash:
+            parser.error(f"--watch ne ide uz {', '.join(clash)}")
+    if args.merge:
+        log = merge(args.date, args.pool_dir)
+        print(f"merged {len(log['shards'])} shards, {log['stream']['fixtures']} fixtures, "
+              f"wall={log['metrics']['wall_sec']}s", flush=True)
+        raise SystemExit(0)
+    shard = (*args.shard, args.shard_by) if args.shard else None
+    if args.watch:
+        while True:
+            log = run(args.date, deadline=args.deadline)
+            m = log["metrics"]
+            print(
+                f"{log['generated_at']} computed={log['dag']['computed']} reused={log['dag']['reused']} "
+                f"written={m.get('publish', {}).get('files_written', 0)} "
+                f"calls={int(sum(m.get('http', {}).values()))} wall={m['wall_sec']}s",
+                flush=True,
+            )
+            time.sleep(args.watch)
+    result = run(args.date, dry_run=args.dry_run, deadline=args.deadline, resume=args.resume,
+                 shard=shard, pool_dir=args.pool_dir)
+    if args.dry_run:
+        print(plan.describe(result))
+        print(json.dumps(result.to_dict(), ensure_ascii=False))
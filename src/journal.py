@@ -0,0 +1,91 @@
+# src/journal.py
+# dnevnik run-ova: append-only JSONL po danu (.cache/runs/<datum>.jsonl), red po checkpointu
+# (start, fetched, indexed, built, written, done/failed); --resume iz njega zna šta je
+# prekinut run već platio i preuzima to umesto da kreće od prvog meča
+import json, os, time
+from typing import Any, Dict, Iterable, List, Optional
+from .util import STATE_DIR
+
+JOURNAL_DIR = os.path.join(STATE_DIR, "runs")
+
+START, FETCHED, INDEXED, BUILT, WRITTEN, DONE, FAILED = (
+    "start", "fetched", "indexed", "built", "written", "done", "failed",
+)
+
+def _path(date: str, scope: str = "") -> str:
+    return os.path.join(JOURNAL_DIR, f"{date}{scope}.jsonl")
+
+class Journal:
+    # scope: zaseban dnevnik za deo dana (shard), da --resume jednog workera ne preuzme tuđ run
+    def __init__(self, date: str, scope: str = ""):
+        self.date = date
+        self.scope = scope
+        self.run = f"{int(time.time() * 1000):x}-{os.getpid()}"
+        self.started = False
+
+    def log(self, stage: str, **fields: Any) -> None:
+        # jedan write sa O_APPEND: red je ceo ili ga nema, i kad više procesa piše isti dan
+        line = json.dumps({"run": self.run, "t": round(time.time(), 3), "stage": stage, **fields},
+                          separators=(",", ":")) + "\n"
+        os.makedirs(JOURNAL_DIR, exist_ok=True)
+        fd = os.open(_path(self.date, self.scope), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+        if stage == START:
+            self.started = True
+
+    def ids(self, stage: str, ids: Iterable[int]) -> None:
+        ids = list(ids)
+        if ids:
+            self.log(stage, ids=ids)
+
+def read(date: str, scope: str = "") -> List[Dict[str, Any]]:
+    rows = []
+    try:
+        with open(_path(date, scope), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    pass  # presečen poslednji red (proces ubijen usred upisa)
+    except OSError:
+        pass
+    return rows
+
+def _summary(rows: List[Dict[str, Any]], run: str) -> Dict[str, Any]:
+    out: Dict[str, Any] = {
+        "run": run, "status": None, "partial": False, "resumed_from": None,
+        FETCHED: set(), INDEXED: set(), BUILT: set(), WRITTEN: [],
+    }
+    for r in rows:
+        if r["run"] != run:
+            continue
+        stage = r["stage"]
+        if stage in (FETCHED, INDEXED, BUILT):
+            out[stage].update(r.get("ids", ()))
+        elif stage == WRITTEN:
+            out[WRITTEN].extend(r.get("files", ()))
+        elif stage == START:
+            out["resumed_from"] = r.get("resumed_from")
+        elif stage in (DONE, FAILED):
+            out["status"] = stage
+            out["partial"] = r.get("partial", False)
+    return out
+
+def pending(date: str, scope: str = "") -> Optional[Dict[str, Any]]:
+    # poslednji run koji ima šta da se nastavi: pao, ubijen (bez done) ili završen kao partial;
+    # lanac --resume run-ova se sabira, pa drugi nastavak vidi i ono što je platio prvi
+    rows = read(date, scope)
+    if not rows:
+        return None
+    run = _summary(rows, rows[-1]["run"])
+    if run["status"] == DONE and not run["partial"]:
+        return None
+    older = run
+    while older["resumed_from"]:
+        older = _summary(rows, older["resumed_from"])
+        for stage in (FETCHED, INDEXED, BUILT):
+            run[stage] |= older[stage]
+    return run
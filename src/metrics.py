@@ -0,0 +1,86 @@
+# src/metrics.py
+# vreme po fazama, HTTP pozivi po endpointu, throttle/retry, keš i upisani bajtovi;
+# sve ide u log.json pod "metrics", a po želji i kao Chrome trace / JSONL
+import cProfile, functools, json, os, threading, time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List
+
+TRACE_PATH = os.getenv("METRICS_TRACE")  # *.json = Chrome trace (chrome://tracing, Perfetto), *.jsonl = red po događaju
+PROFILE_PATH = os.getenv("METRICS_PROFILE")  # cProfile oko generate.run, čita se sa python -m pstats
+
+_lock = threading.Lock()
+_stages: Dict[str, float] = {}
+_counters: Dict[str, Dict[str, float]] = {}
+_events: List[Dict[str, Any]] = []
+_t0 = time.perf_counter()
+
+def count(group: str, key: str, n: float = 1) -> None:
+    with _lock:
+        g = _counters.setdefault(group, {})
+        g[key] = g.get(key, 0) + n
+
+def add_time(stage: str, seconds: float, start: float = None) -> None:
+    with _lock:
+        _stages[stage] = _stages.get(stage, 0.0) + seconds
+        if TRACE_PATH and start is not None:
+            _events.append({
+                "name": stage, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+                "ts": round((start - _t0) * 1e6), "dur": round(seconds * 1e6),
+            })
+
+@contextmanager
+def timer(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(stage, time.perf_counter() - start, start)
+
+def timed(stage: str) -> Callable:
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def snapshot() -> Dict[str, Any]:
+    # vreme faza se sabira po nitima, pa paralelni pozivi mogu zbirno preći wall time
+    with _lock:
+        out: Dict[str, Any] = {"stages": {k: round(v, 4) for k, v in sorted(_stages.items())}}
+        for group, values in sorted(_counters.items()):
+            out[group] = {k: round(v, 4) if isinstance(v, float) else v for k, v in sorted(values.items())}
+    return out
+
+def reset() -> None:
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+        _events.clear()
+
+def dump_trace(path: str = None) -> None:
+    path = path or TRACE_PATH
+    if not path:
+        return
+    with _lock:
+        events = list(_events)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for e in events:
+                f.write(json.dumps(e) + "\n")
+        else:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+def profiled(fn: Callable) -> Callable:
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not PROFILE_PATH:
+            return fn(*args, **kwargs)
+        prof = cProfile.Profile()
+        try:
+            return prof.runcall(fn, *args, **kwargs)
+        finally:
+            prof.dump_stats(PROFILE_PATH)
+    return wrapper
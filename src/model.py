@@ -0,0 +1,222 @@
+# src/model.py
+# Poisson model golova iz forme timova: očekivani golovi iz proseka postignutih i primljenih
+# (tabela lige, a /teams/statistics samo za timove kojih u tabeli nema), pa verovatnoće
+# MW/DC/BTTS/OU iz matrice rezultata za ceo prozor mečeva odjednom. Builderi iz njih
+# dobijaju prob i edge (model × najbolja kvota - 1), a compose po edge-u rangira noge
+import math, os, threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from . import analytics, metrics, odds
+from .slim import Fixture
+
+ENABLED = os.getenv("ENRICH", "0") == "1"  # dodatni pozivi: tabela po ligi-sezoni, statistika gde tabele nema
+WEIGHT = float(os.getenv("MODEL_WEIGHT", "0.5"))  # udeo modela u prob noge, ostatak je fer verovatnoća tržišta
+MAX_GOALS = 10  # matrica rezultata 0..MAX_GOALS po timu; ostatak mase je zanemarljiv
+H2H_LAST = 5
+
+# plan dohvata tabelu jednom po ligi-sezoni za svaki meč koji model pokriva
+NEEDS = ("standings",)
+
+def wants(f: Fixture) -> bool:
+    return ENABLED
+
+Form = Tuple[float, float, float, float]  # po utakmici: dao kod kuće, primio kod kuće, dao u gostima, primio u gostima
+
+_lock = threading.Lock()
+_tables: Dict[Tuple[int, int], Dict[int, Form]] = {}
+_teams: Dict[Tuple[int, int, int], Optional[Form]] = {}
+_h2h: Dict[Tuple[int, int], Optional[Dict[str, Any]]] = {}
+
+def _rate(goals: Any, played: Any) -> Optional[float]:
+    try:
+        return float(goals) / float(played) if played else None
+    except (TypeError, ValueError):
+        return None
+
+def _form(home: Iterable[Optional[float]], away: Iterable[Optional[float]]) -> Optional[Form]:
+    values = (*home, *away)
+    return None if None in values else values
+
+def _table_rows(value: Any) -> Dict[int, Form]:
+    # /standings: response[0].league.standings je lista grupa (tabela po grupi)
+    out: Dict[int, Form] = {}
+    for item in (value or {}).get("response", []):
+        for group in (item.get("league") or {}).get("standings", []):
+            for row in group:
+                team = (row.get("team") or {}).get("id")
+                h, a = row.get("home") or {}, row.get("away") or {}
+                form = _form(
+                    (_rate((h.get("goals") or {}).get("for"), h.get("played")),
+                     _rate((h.get("goals") or {}).get("against"), h.get("played"))),
+                    (_rate((a.get("goals") or {}).get("for"), a.get("played")),
+                     _rate((a.get("goals") or {}).get("against"), a.get("played"))),
+                )
+                if team is not None and form:
+                    out[team] = form
+    return out
+
+def _stats_form(value: Any) -> Optional[Form]:
+    # /teams/statistics: proseci su stringovi ("1.5"), 0 odigranih znači da proseka nema
+    resp = (value or {}).get("response") or {}
+    played = ((resp.get("fixtures") or {}).get("played")) or {}
+    goals = resp.get("goals") or {}
+    avg = lambda side, venue: (((goals.get(side) or {}).get("average")) or {}).get(venue)
+    if not played.get("home") or not played.get("away"):
+        return None
+    return _form(
+        (_rate(avg("for", "home"), 1), _rate(avg("against", "home"), 1)),
+        (_rate(avg("for", "away"), 1), _rate(avg("against", "away"), 1)),
+    )
+
+def _memo(store: Dict[Any, Any], key: Any, load) -> Any:
+    # jedno čitanje (i najviše jedan poziv) po ključu u procesu; neuspeh se pamti kao None
+    with _lock:
+        if key in store:
+            return store[key]
+    try:
+        value = load()
+    except Exception:
+        value = None
+    with _lock:
+        return store.setdefault(key, value)
+
+def table(league: int, season: int) -> Dict[int, Form]:
+    return _memo(_tables, (league, season), lambda: _table_rows(odds.standings_all(league, season))) or {}
+
+def team_form(league: int, season: int, team: int) -> Optional[Form]:
+    # tabela lige pokriva sve timove jednim pozivom; statistika tima samo kad tabele nema
+    form = table(league, season).get(team)
+    if form is not None:
+        return form
+    return _memo(_teams, (league, season, team), lambda: _stats_form(odds.teams_statistics(league, season, team)))
+
+def uncovered(fixtures: Iterable[Fixture]) -> List[Tuple[int, int, int]]:
+    # (liga, sezona, tim) za koje tabela nema red: to je jedino što ide na /teams/statistics
+    seen = set()
+    out = []
+    for f in fixtures:
+        if f.season is None:
+            continue
+        rows = table(f.league_id, f.season)
+        for team in (f.home_id, f.away_id):
+            key = (f.league_id, f.season, team)
+            if team is not None and team not in rows and key not in seen:
+                seen.add(key)
+                out.append(key)
+    return out
+
+def estimate(fixtures: Iterable[Fixture], pending: Iterable[Tuple[int, int]]) -> List[Tuple[int, int, int]]:
+    # uncovered() za plan, pre dohvatanja: liga-sezona čija tabela tek treba da stigne
+    # (pending) računa oba tima, za ostale tabela je već u kešu pa poziva nema
+    pending = set(pending)
+    seen = set()
+    out = []
+    for f in fixtures:
+        if f.season is None:
+            continue
+        rows = {} if (f.league_id, f.season) in pending else table(f.league_id, f.season)
+        for team in (f.home_id, f.away_id):
+            key = (f.league_id, f.season, team)
+            if team is not None and team not in rows and key not in seen:
+                seen.add(key)
+                out.append(key)
+    return out
+
+def rates(fixtures: List[Fixture]) -> Tuple[np.ndarray, np.ndarray]:
+    # očekivani golovi domaćina i gosta; NaN kad forma nekog tima nije poznata
+    lh = np.full(len(fixtures), np.nan)
+    la = np.full(len(fixtures), np.nan)
+    for i, f in enumerate(fixtures):
+        if f.season is None or f.home_id is None or f.away_id is None:
+            continue
+        home = team_form(f.league_id, f.season, f.home_id)
+        away = team_form(f.league_id, f.season, f.away_id)
+        if home and away:
+            lh[i] = (home[0] + away[3]) / 2
+            la[i] = (away[2] + home[1]) / 2
+    return lh, la
+
+_GOALS = np.arange(MAX_GOALS + 1)
+_FACT = np.array([math.factorial(k) for k in _GOALS], dtype=float)
+_TOTAL = _GOALS[:, None] + _GOALS[None, :]
+
+def probabilities(lh: np.ndarray, la: np.ndarray) -> np.ndarray:
+    # F × len(analytics.SLOTS) verovatnoća po slotu; NaN za mečeve bez λ i za slotove van modela
+    out = np.full((len(lh), len(analytics.SLOTS)), np.nan)
+    ok = ~(np.isnan(lh) | np.isnan(la))
+    if not ok.any():
+        return out
+    lh, la = np.maximum(lh[ok], 0.05), np.maximum(la[ok], 0.05)
+    ph = np.exp(-lh)[:, None] * lh[:, None] ** _GOALS / _FACT
+    pa = np.exp(-la)[:, None] * la[:, None] ** _GOALS / _FACT
+    grid = ph[:, :, None] * pa[:, None, :]  # F × golovi domaćina × golovi gosta
+    grid /= grid.sum(axis=(1, 2))[:, None, None]
+    home = np.tril(grid, -1).sum(axis=(1, 2))
+    draw = np.einsum("fii->f", grid)
+    away = np.triu(grid, 1).sum(axis=(1, 2))
+    p = {("MW", "Home"): home, ("MW", "Draw"): draw, ("MW", "Away"): away}
+    p[("DC", "Home/Draw")], p[("DC", "Home/Away")], p[("DC", "Draw/Away")] = home + draw, home + away, draw + away
+    p[("BTTS", "Yes")] = grid[:, 1:, 1:].sum(axis=(1, 2))
+    p[("BTTS", "No")] = 1.0 - p[("BTTS", "Yes")]
+    for line in analytics.OU_LINES:
+        over = grid[:, _TOTAL > float(line)].sum(axis=1)
+        p[("OU", f"Over {line}")], p[("OU", f"Under {line}")] = over, 1.0 - over
+    rows = np.flatnonzero(ok)
+    for key, values in p.items():
+        out[rows, analytics.SLOT[key]] = values
+    return out
+
+def annotate(fixtures: List[Fixture], index: List[Dict[str, Any]]) -> None:
+    # index[i] je meč fixtures[i]: markets[m][sel] dobija "model" i "edge", unos dobija "model"
+    if not index:
+        return
+    lh, la = rates(fixtures)
+    probs = probabilities(lh, la)
+    covered = 0
+    for i, (f, e) in enumerate(zip(fixtures, index)):
+        if np.isnan(lh[i]):
+            continue
+        covered += 1
+        e["model"] = {"xg": [round(float(lh[i]), 3), round(float(la[i]), 3)], "teams": [f.home_id, f.away_id]}
+        for market, sels in e["markets"].items():
+            for sel, price in sels.items():
+                s = analytics.SLOT.get((market, sel))
+                if s is None or np.isnan(probs[i, s]):
+                    continue
+                p = float(probs[i, s])
+                price["model"] = round(p, 4)
+                price["edge"] = round(p * price["best"] - 1.0, 4)
+    metrics.count("model", "fixtures", covered)
+
+def prob(price: Dict[str, Any]) -> float:
+    # prob noge za buildere: model pomešan sa fer verovatnoćom tržišta, bez modela samo tržište
+    fair = analytics.fair_prob(price)
+    if "model" not in price:
+        return fair
+    return WEIGHT * price["model"] + (1.0 - WEIGHT) * fair
+
+def edge(price: Dict[str, Any]) -> Dict[str, float]:
+    # polje "edge" za nogu, samo kad je model pokrio meč
+    return {"edge": price["edge"]} if "edge" in price else {}
+
+def h2h(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # poslednji međusobni mečevi, samo za shortlist (single_analysis): najviše MAX_FIXTURES poziva
+    teams = (entry.get("model") or {}).get("teams")
+    if not teams:
+        return None
+
+    def load() -> Optional[Dict[str, Any]]:
+        games = [
+            g for g in odds.h2h(teams[0], teams[1], H2H_LAST)
+            if (g.get("goals") or {}).get("home") is not None and (g.get("goals") or {}).get("away") is not None
+        ]
+        if not games:
+            return None
+        goals = [(g["goals"]["home"], g["goals"]["away"]) for g in games]
+        return {
+            "played": len(goals),
+            "avg_goals": round(sum(h + a for h, a in goals) / len(goals), 2),
+            "btts": sum(1 for h, a in goals if h and a),
+        }
+
+    return _memo(_h2h, tuple(sorted(teams)), load)
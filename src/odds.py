@@ -1,71 +1,384 @@
-from typing import Any, Dict, List
-from . import api, cache
+import os, threading, time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple, Union
+from . import allow, analytics, api, cache, model, slim, snapshots, ttl
 from .util import today_iso
 
-def fixtures_by_date(date: str = None) -> List[Dict[str, Any]]:
+# "date" = jedan paginirani /odds?date= za ceo dan, "leagues" = samo allow.ALLOWED_LEAGUES, "off" = paralelno po meču
+ODDS_BULK = os.getenv("ODDS_BULK", "date")
+ODDS_PAGE_SIZE = 10  # API-Football /odds vraća 10 mečeva po strani
+NEG_TTL = int(os.getenv("CACHE_NEG_TTL", "900"))  # prazan odgovor (meč bez kvota, dan bez mečeva)
+SWR = os.getenv("CACHE_SWR", "1") == "1"
+STALE_MAX_AGE = int(os.getenv("CACHE_STALE_MAX_AGE", str(24 * 3600)))
+STREAM_WINDOW = int(os.getenv("STREAM_WINDOW", "50"))  # koliko mečeva stream_index drži pre nego što ih preda
+
+Shape = Callable[[Dict[str, Any]], Any]
+Ttl = Union[int, Callable[[Any], int]]
+
+_stale_lock = threading.Lock()
+_stale: Dict[str, Tuple[str, Dict[str, Any], Shape]] = {}
+STATS = {"hits": 0, "misses": 0, "negative_hits": 0, "stale_served": 0, "stale_fallbacks": 0}
+
+def reset_stats() -> None:
+    # brojači su po run-u: generate --watch ponavlja run u istom procesu
+    for key in STATS:
+        STATS[key] = 0
+
+def _first(data: Dict[str, Any]) -> Dict[str, Any]:
+    resp = data.get("response", [])
+    return resp[0] if resp else {}
+
+def _response(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return data.get("response", [])
+
+def _whole(data: Dict[str, Any]) -> Dict[str, Any]:
+    return data
+
+def _is_negative(value: Any) -> bool:
+    if isinstance(value, dict) and "response" in value:
+        return not value["response"]
+    return not value
+
+def _store(key: str, value: Any) -> None:
+    cache.set(key, value, negative=_is_negative(value))
+
+def _max_age(max_age: Ttl, value: Any, negative: bool) -> int:
+    limit = max_age(value) if callable(max_age) else max_age
+    # nepromenljiv odgovor ostaje nepromenljiv i kad je prazan (završen meč bez kvota)
+    if negative and limit < ttl.FOREVER:
+        return min(NEG_TTL, limit)
+    return limit
+
+def fresh(key: str, max_age: Ttl) -> bool:
+    # unos postoji i mlađi je od svog ttl-a (plan po tome zna šta ne mora da traži)
+    entry = cache.get_entry(key)
+    return entry is not None and time.time() - entry[0] <= _max_age(max_age, entry[1], entry[2])
+
+def _cached(key: str, max_age: Ttl, path: str, params: Dict[str, Any], shape: Shape) -> Any:
+    entry = cache.get_entry(key)
+    if entry is not None:
+        ts, value, negative = entry
+        age = time.time() - ts
+        if age <= _max_age(max_age, value, negative):
+            STATS["hits"] += 1
+            if negative:
+                STATS["negative_hits"] += 1
+            return value
+        if SWR and not negative and age <= STALE_MAX_AGE:
+            # vrati odmah, osveži na kraju run-a (revalidate)
+            with _stale_lock:
+                _stale[key] = (path, params, shape)
+            STATS["stale_served"] += 1
+            return value
+    STATS["misses"] += 1
+    try:
+        value = shape(api.get(path, params))
+    except RuntimeError:
+        if entry is None:
+            raise
+        STATS["stale_fallbacks"] += 1
+        return entry[1]
+    _store(key, value)
+    return value
+
+def revalidate() -> Dict[str, int]:
+    with _stale_lock:
+        pending = list(_stale.items())
+        _stale.clear()
+    stats = {"refreshed": 0, "failed": 0}
+    results = api.get_many((path, params) for _, (path, params, _) in pending)
+    for (key, (_, _, shape)), data in zip(pending, results):
+        if isinstance(data, Exception):
+            stats["failed"] += 1
+            continue
+        _store(key, shape(data))
+        stats["refreshed"] += 1
+    return stats
+
+def _keep_raw(key: str, raw: Any, project: Callable[[Any], Any]) -> Any:
+    # projekcija ide u keš; sirov odgovor samo ako je traženo (slim.KEEP_RAW)
+    if slim.KEEP_RAW:
+        cache.set(f"raw_{key}", raw, negative=_is_negative(raw))
+    return project(raw)
+
+def _slim_odds(item: Dict[str, Any]) -> Dict[str, Any]:
+    return slim.odds(item, MARKET_ALIASES)
+
+def fixtures_by_date(date: str = None) -> List[slim.Fixture]:
     date = date or today_iso()
-    ck = f"fixtures_{date}"
-    cached = cache.get(ck, 1800)
-    if cached:
-        return cached
-    data = api.get("/fixtures", {"date": date})
-    fixtures = data.get("response", [])
-    cache.set(ck, fixtures)
+    key = f"fixtures_{date}"
+    rows = _cached(key, lambda v: ttl.for_fixtures(date, slim.fixtures(v)), "/fixtures", {"date": date},
+                   lambda data: _keep_raw(key, _response(data), slim.fixture_rows))
+    fixtures = slim.fixtures(rows)
+    ttl.observe_fixtures(fixtures)
     return fixtures
 
 def odds_by_fixture(fid: int) -> Dict[str, Any]:
-    ck = f"odds_{fid}"
-    cached = cache.get(ck, 3600)
-    if cached:
-        return cached
-    data = api.get("/odds", {"fixture": fid})
-    resp = data.get("response", [])
-    parsed = resp[0] if resp else {}
-    cache.set(ck, parsed)
-    return parsed
+    key = f"odds_{fid}"
+    return _slim_odds(_cached(key, ttl.for_odds(fid), "/odds", {"fixture": fid},
+                              lambda data: _keep_raw(key, _first(data), _slim_odds)))
+
+def _odds_pages(params: Dict[str, Any], stats: Dict[str, int], until: float = None) -> Iterator[Dict[str, Any]]:
+    page = 1
+    while True:
+        if _past(until, stats):
+            return
+        data = api.get("/odds", {**params, "page": page})
+        stats["calls"] += 1
+        yield from data.get("response", [])
+        paging = data.get("paging") or {}
+        if page >= int(paging.get("total") or 1):
+            return
+        page += 1
+
+def _missing_odds(fixtures: List[slim.Fixture]) -> Dict[int, int]:
+    return {f.id: f.league_id for f in fixtures if not fresh(f"odds_{f.id}", ttl.for_odds(f.id))}
+
+def _pages(day: int) -> int:
+    # strane /odds?date= za dan od day mečeva; bulk po datumu uvek lista ceo dan
+    return -(-day // ODDS_PAGE_SIZE)
+
+def odds_cost(fixtures: List[slim.Fixture], mode: str = None, day: int = None) -> int:
+    # procena API poziva koje bi stream_index potrošio za ove mečeve; day: broj mečeva
+    # celog dana kad je fixtures samo deo (shard), jer /odds?date= lista ceo dan
+    mode = mode or ODDS_BULK
+    missing = _missing_odds(fixtures)
+    if not missing:
+        return 0
+    if mode == "date":
+        return min(len(missing), _pages(day or len(fixtures)))
+    if mode == "leagues":
+        per_league: Dict[int, int] = {}
+        for league in missing.values():
+            per_league[league] = per_league.get(league, 0) + 1
+        return sum(
+            -(-n // ODDS_PAGE_SIZE) if league in allow.ALLOWED_LEAGUES else n
+            for league, n in per_league.items()
+        )
+    return len(missing)
+
+def _bulk_stats(mode: str) -> Dict[str, Any]:
+    return {"mode": mode, "calls": 0, "fixtures": 0, "saved": 0, "parallel": 0}
+
+def _past(until: float, stats: Dict[str, Any]) -> bool:
+    # rok (time.perf_counter()) je prošao: novi pozivi se ne šalju, stats["cut"] beleži prekid
+    if until is not None and time.perf_counter() > until:
+        stats["cut"] = True
+    return stats.get("cut", False)
+
+def _fetch_odds(date: str, mode: str, fixtures: List[slim.Fixture], missing: Dict[int, int],
+                stats: Dict[str, Any], window: int, until: float = None,
+                day: int = None) -> Iterator[Tuple[int, Any]]:
+    # (fid, sirove kvote) čim stignu; None = poziv nije uspeo, čitalac pokušava sam.
+    # day: broj mečeva celog dana kad je fixtures samo deo (plan, shard), isto kao odds_cost
+    if mode == "date" and len(missing) <= _pages(day or len(fixtures)):
+        # par isteklih unosa je jeftinije dohvatiti po meču nego prelistati ceo dan
+        mode = stats["mode"] = "off"
+    if mode == "date":
+        queries = [{"date": date}]
+    elif mode == "leagues":
+        queries = [
+            {"date": date, "league": league, "season": season}
+            for league, season in allow.leagues()
+            if league in missing.values()
+        ]
+    else:
+        queries = []
+    # razbacujemo bulk odgovor u iste odds_{fid} unose koje čita odds_by_fixture
+    paged = True
+    for q in queries:
+        try:
+            for item in _odds_pages(q, stats, until):
+                fid = (item.get("fixture") or {}).get("id")
+                if fid not in missing:
+                    continue
+                item = _keep_raw(f"odds_{fid}", item, _slim_odds)
+                cache.set(f"odds_{fid}", item)
+                missing.pop(fid)
+                stats["fixtures"] += 1
+                stats["saved"] = max(stats["fixtures"] - stats["calls"], 0)
+                yield fid, item
+        except RuntimeError as e:
+            if fatal(e):
+                raise
+            # strana koja ne prolazi ni posle retry-ja: ostatak ide po meču
+            paged = False
+            break
+    if stats.get("cut"):
+        return
+    # bulk po datumu pokriva sve mečeve koji imaju kvote: ostali su negativni unosi
+    if mode == "date" and paged:
+        for fid in list(missing):
+            cache.set(f"odds_{fid}", {}, negative=True)
+            yield fid, {}
+        return
+    # ostatak paralelno po meču, u talasima od window da prvi rezultati ne čekaju poslednje
+    rest = list(missing)
+    for i in range(0, len(rest), max(window, 1)):
+        if _past(until, stats):
+            return
+        chunk = rest[i:i + max(window, 1)]
+        results = api.get_many(("/odds", {"fixture": fid}) for fid in chunk)
+        # ceo talas je plaćen: sve uspešno ide u keš pre nego što se išta preda (ili prekine)
+        done: List[Tuple[int, Any]] = []
+        stop = None
+        for fid, data in zip(chunk, results):
+            if isinstance(data, Exception):
+                if fatal(data):
+                    stop = stop or data
+                else:
+                    done.append((fid, None))
+                continue
+            odds = _keep_raw(f"odds_{fid}", _first(data), _slim_odds)
+            _store(f"odds_{fid}", odds)
+            stats["parallel"] += 1
+            done.append((fid, odds))
+        yield from done
+        if stop is not None:
+            raise stop
+
+def fatal(e: BaseException) -> bool:
+    # greška posle koje nema smisla slati dalje pozive: kvota ili ključ; ostalo je jedan meč
+    return isinstance(e, api.QuotaExceeded) or (isinstance(e, api.ApiError) and e.status in (401, 403))
 
 def h2h(f1: int, f2: int, last: int = 5) -> List[Dict[str, Any]]:
-    ck = f"h2h_{f1}_{f2}_{last}"
-    cached = cache.get(ck, 3600)
-    if cached:
-        return cached
-    data = api.get("/fixtures/headtohead", {"h2h": f"{f1}-{f2}", "last": last})
-    res = data.get("response", [])
-    cache.set(ck, res)
-    return res
+    return _cached(f"h2h_{f1}_{f2}_{last}", ttl.for_h2h(), "/fixtures/headtohead", {"h2h": f"{f1}-{f2}", "last": last}, _response)
 
 def teams_statistics(league: int, season: int, team: int) -> Dict[str, Any]:
-    ck = f"stats_{league}_{season}_{team}"
-    cached = cache.get(ck, 3600)
-    if cached:
-        return cached
-    data = api.get("/teams/statistics", {
+    return _cached(f"stats_{league}_{season}_{team}", ttl.for_season("stats", season), "/teams/statistics", {
         "league": league,
         "season": season,
         "team": team
-    })
-    cache.set(ck, data)
-    return data
+    }, _whole)
 
 def standings_all(league: int, season: int) -> Dict[str, Any]:
-    ck = f"standings_{league}_{season}"
-    cached = cache.get(ck, 3600)
-    if cached:
-        return cached
-    data = api.get("/standings", {
+    return _cached(f"standings_{league}_{season}", ttl.for_season("standings", season), "/standings", {
         "league": league,
         "season": season
-    })
-    cache.set(ck, data)
-    return data
+    }, _whole)
 
 def predictions_by_fixture(fid: int) -> Dict[str, Any]:
-    ck = f"pred_{fid}"
-    cached = cache.get(ck, 3600)
-    if cached:
-        return cached
-    data = api.get("/predictions", {"fixture": fid})
-    resp = data.get("response", [])
-    parsed = resp[0] if resp else {}
-    cache.set(ck, parsed)
-    return parsed
+    return _cached(f"pred_{fid}", ttl.for_predictions(fid), "/predictions", {"fixture": fid}, _first)
+
+# API-Football ne vraća uvek isto ime marketa, pa ih svodimo na jedan ključ
+MARKET_ALIASES = {
+    "Match Winner": "MW",
+    "Matchwinner": "MW",
+    "1x2": "MW",
+    "Double Chance": "DC",
+    "Double chance": "DC",
+    "Both Teams Score": "BTTS",
+    "Both Teams To Score": "BTTS",
+    "Over/Under": "OU",
+    "Goals Over/Under": "OU",
+}
+
+def index_odds(odds: Dict[str, Any]) -> Dict[str, Dict[str, Dict[str, float]]]:
+    # odds je projekcija iz slim.odds: marketi su već svedeni, kvote su float
+    prices: Dict[str, Dict[str, List[float]]] = {}
+    for market, sel, odd in zip(odds.get("m", ()), odds.get("s", ()), odds.get("o", ())):
+        prices.setdefault(market, {}).setdefault(sel, []).append(odd)
+    return {
+        market: {
+            sel: {
+                "best": max(odds_list),
+                "count": len(odds_list),
+                "avg": sum(odds_list) / len(odds_list),
+            }
+            for sel, odds_list in sels.items()
+        }
+        for market, sels in prices.items()
+    }
+
+def index_entry(f: slim.Fixture, odds: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "fixture_id": f.id,
+        "kickoff": f.kickoff,
+        "status": f.status,
+        "league_id": f.league_id,
+        "league_name": f.league_name,
+        "season": f.season,
+        "home": f.home,
+        "away": f.away,
+        "markets": index_odds(odds),
+    }
+
+def _index_batch(pairs: List[Tuple[slim.Fixture, Dict[str, Any]]], date: str) -> List[Dict[str, Any]]:
+    index = [index_entry(f, o) for f, o in pairs]
+    # konsenzus, marža i fer verovatnoće su po meču, pa se računaju po delovima isto kao odjednom
+    analytics.load([e["fixture_id"] for e in index], [o for _, o in pairs]).annotate(index)
+    if model.ENABLED:
+        model.annotate([f for f, _ in pairs], index)
+    if snapshots.ENABLED:
+        snapshots.record(date, ((f.id, o) for f, o in pairs))
+        snapshots.annotate(date, index)
+    return index
+
+def stream_index(date: str = None, fixtures: List[slim.Fixture] = None, mode: str = None,
+                 window: int = STREAM_WINDOW, stats: Dict[str, Any] = None,
+                 until: float = None, reuse: Iterable[int] = (),
+                 checkpoint: Callable[[str, List[int]], None] = None,
+                 day: int = None) -> Iterator[Dict[str, Any]]:
+    # index unos po unos kako kvote stižu: prvo sveže iz keša, pa bulk strane, pa ostatak po meču;
+    # u memoriji je samo tekući prozor od window mečeva (sirove kvote se odbacuju posle index-a).
+    # until (time.perf_counter()): posle toga nema novih poziva, predaje se ono što je već
+    # stiglo i stats["cut"] postaje True; isto kod iscrpljene kvote ili odbijenog ključa
+    # (stats["error"]). Meč koji ne prolazi ni posle retry-ja se preskače (stats["skipped"]).
+    # reuse: mečevi čije kvote je platio prekinut run, uzimaju se iz keša bez obzira na starost.
+    # checkpoint("fetched" | "indexed", ids) se zove posle svakog prozora; day kao u _fetch_odds
+    date = date or today_iso()
+    stats = stats if stats is not None else _bulk_stats(mode or ODDS_BULK)
+    if fixtures is None:
+        fixtures = fixtures_by_date(date)
+    kept: Dict[int, Dict[str, Any]] = {}
+    for fid in set(reuse) & {f.id for f in fixtures}:
+        entry = cache.get_entry(f"odds_{fid}")
+        if entry is not None:
+            kept[fid] = _slim_odds(entry[1])
+    missing = {fid: league for fid, league in _missing_odds(fixtures).items() if fid not in kept}
+    by_id = {f.id: f for f in fixtures}
+    fetched: List[int] = []
+
+    def pairs() -> Iterator[Tuple[slim.Fixture, Dict[str, Any]]]:
+        for f in fixtures:
+            if f.id in kept:
+                yield f, kept.pop(f.id)
+            elif f.id not in missing:
+                yield f, odds_by_fixture(f.id)
+        if missing:
+            for fid, raw in _fetch_odds(date, stats["mode"], fixtures, missing, stats, window, until, day):
+                if raw is None:
+                    # meč koji ne prolazi ni posle retry-ja: stari unos ako ga ima, inače se
+                    # preskače (nije u journalu, pa ga --resume traži ponovo)
+                    entry = cache.get_entry(f"odds_{fid}")
+                    if entry is None:
+                        stats["skipped"] = stats.get("skipped", 0) + 1
+                        continue
+                    STATS["stale_fallbacks"] += 1
+                    raw = _slim_odds(entry[1])
+                fetched.append(fid)
+                yield by_id[fid], raw
+
+    def flush(batch: List[Tuple[slim.Fixture, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        index = _index_batch(batch, date)
+        if checkpoint is not None:
+            checkpoint("fetched", fetched[:])
+            checkpoint("indexed", [f.id for f, _ in batch])
+        fetched.clear()
+        return index
+
+    batch: List[Tuple[slim.Fixture, Dict[str, Any]]] = []
+    stats["cut"] = False
+    try:
+        for pair in pairs():
+            batch.append(pair)
+            if len(batch) >= window:
+                yield from flush(batch)
+                batch = []
+    except RuntimeError as e:
+        # iscrpljena kvota ili odbijen ključ (pojedinačni mečevi se samo preskaču):
+        # ono što je stiglo ide dalje, sledeći --resume nastavlja odavde
+        stats["cut"] = True
+        stats["error"] = str(e)
+        stats["quota"] = isinstance(e, api.QuotaExceeded)
+    if batch:
+        yield from flush(batch)
@@ -0,0 +1,257 @@
+# src/plan.py
+# plan poziva pre bilo kakvog dohvatanja: filteri po ligi, sezoni i terminu,
+# pa deduplikovan spisak šta kom meču treba (kvote, predikcije, statistika)
+import hashlib, math, os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from . import allow, api, model, odds, quota, ttl
+from .builders import safe_dc, btts, ou, mw_value, single_analysis
+from .slim import Fixture
+from .util import today_iso
+
+PLAN_SCOPE = os.getenv("PLAN_SCOPE", "all")  # all | allowed (ALLOWED_LEAGUES + ALLOWED_COMPETITIONS)
+PLAN_SEASON = os.getenv("PLAN_SEASON")  # npr. "2025"; prazno = bez filtera osim allow.py
+PLAN_WINDOW = os.getenv("PLAN_WINDOW", "0-24")  # sati (UTC) u kojima mora biti početak
+PLAN_SKIP_STARTED = os.getenv("PLAN_SKIP_STARTED", "1") == "1"  # za danas i dalje
+EST_LATENCY = float(os.getenv("PLAN_EST_LATENCY", "0.5"))  # prosečno trajanje jednog poziva
+SHARD_BY = os.getenv("SHARD_BY", "league")  # league | hash: kako generate --shard deli mečeve
+
+# model nije builder, ali potrebe (tabele liga) javlja istim putem
+BUILDERS = [safe_dc, btts, ou, mw_value, single_analysis, model]
+KINDS = ("odds", "predictions", "stats", "standings")
+# statistika timova kojih nema u tabeli: drugi talas execute_extra, plan je samo procenjuje
+FALLBACK = "stats_fallback"
+
+def _window() -> Tuple[float, float]:
+    lo, _, hi = PLAN_WINDOW.partition("-")
+    return float(lo or 0), float(hi or 24)
+
+def priority(f: Fixture) -> int:
+    league = f.league_id
+    if league in allow.ALLOWED_LEAGUES:
+        return 0
+    if league in single_analysis.ALLOWED_COMPETITIONS:
+        return 1
+    return 2
+
+def order(f: Fixture):
+    # redosled u planu i u feedovima; isti je i kad shardovi spajaju svoje noge
+    return (priority(f), f.timestamp or 0, f.id)
+
+def shard_of(f: Fixture, n: int, by: str = None) -> int:
+    # stabilno između run-ova i mašina (hash() nije): isti meč uvek ide istom workeru
+    by = by or SHARD_BY
+    key = f.league_id if by == "league" else f.id
+    h = hashlib.blake2b(str(key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(h, "big") % n
+
+def _reject(f: Fixture, date: str, window: Tuple[float, float]) -> Optional[str]:
+    # razlog zbog kog meč ne ulazi u plan, ili None
+    if PLAN_SCOPE == "allowed" and priority(f) == 2:
+        return "league"
+    season = f.season
+    pinned = allow.ALLOWED_LEAGUES.get(f.league_id)
+    if PLAN_SEASON and season != int(PLAN_SEASON):
+        return "season"
+    if pinned and season is not None and season < pinned:
+        return "season"
+    status = f.status
+    if status in ttl.CANCELLED:
+        return "cancelled"
+    if PLAN_SKIP_STARTED and date >= today_iso() and (status in ttl.LIVE or status in ttl.FINISHED):
+        return "started"
+    ts = f.timestamp
+    if ts is not None:
+        kickoff = datetime.fromtimestamp(ts, timezone.utc)
+        hour = kickoff.hour + kickoff.minute / 60
+        if kickoff.strftime("%Y-%m-%d") == date and not window[0] <= hour < window[1]:
+            return "window"
+    return None
+
+class Plan:
+    # fixtures: mečevi koji ulaze u index; odds/predictions/stats: šta se dohvata, po prioritetu
+    def __init__(self, date: str, mode: str, fixtures: List[Fixture]):
+        self.date = date
+        self.mode = mode
+        self.fixtures = fixtures
+        self.needs: Dict[str, List[Any]] = {kind: [] for kind in (*KINDS, FALLBACK)}
+        self.skipped: Dict[str, int] = {}
+        self.calls = 0
+        self.est_seconds = 0.0
+        self.shard: Optional[Tuple[int, int, str]] = None
+        self.day = len(fixtures)  # svi mečevi dana, pre filtera: /odds?date= lista sve njih
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "date": self.date,
+            "mode": self.mode,
+            "fixtures": len(self.fixtures),
+            "needs": {kind: len(v) for kind, v in self.needs.items()},
+            "skipped": dict(self.skipped),
+            "calls": self.calls,
+            "est_seconds": round(self.est_seconds, 1),
+            "shard": "{}/{}:{}".format(*self.shard) if self.shard else None,
+        }
+
+def _needs(fixtures: List[Fixture]) -> Dict[str, List[Any]]:
+    # builder javlja NEEDS i, opciono, wants(f); skup se deduplikuje po ključu poziva
+    seen: Dict[str, set] = {kind: set() for kind in KINDS}
+    out: Dict[str, List[Any]] = {kind: [] for kind in KINDS}
+    for f in fixtures:
+        fid = f.id
+        for b in BUILDERS:
+            wants = getattr(b, "wants", None)
+            if wants is not None and not wants(f):
+                continue
+            for kind in getattr(b, "NEEDS", ("odds",)):
+                if kind == "stats":
+                    keys = [(f.league_id, f.season, f.home_id), (f.league_id, f.season, f.away_id)]
+                elif kind == "standings":
+                    keys = [(f.league_id, f.season)] if f.season is not None else []
+                else:
+                    keys = [fid]
+                for key in keys:
+                    if key not in seen[kind]:
+                        seen[kind].add(key)
+                        out[kind].append(key)
+    return out
+
+def _fresh_filter(needs: Dict[str, List[Any]]) -> None:
+    # ono što je već u kešu ne ulazi u plan (kvote broji odds_cost)
+    needs["predictions"] = [
+        fid for fid in needs["predictions"]
+        if not odds.fresh(f"pred_{fid}", ttl.for_predictions(fid))
+    ]
+    needs["stats"] = [
+        key for key in needs["stats"]
+        if not odds.fresh("stats_{}_{}_{}".format(*key), ttl.for_season("stats", key[1]))
+    ]
+    needs["standings"] = [
+        key for key in needs["standings"]
+        if not odds.fresh("standings_{}_{}".format(*key), ttl.for_season("standings", key[1]))
+    ]
+
+def _fallback(fixtures: List[Fixture], needs: Dict[str, List[Any]]) -> List[Any]:
+    # timovi koje model.uncovered verovatno vraća, bez onih koji su već u planu ili u kešu
+    if not model.ENABLED:
+        return []
+    wanted = set(needs["stats"])
+    return [
+        key for key in model.estimate(fixtures, needs["standings"])
+        if key not in wanted and not odds.fresh("stats_{}_{}_{}".format(*key), ttl.for_season("stats", key[1]))
+    ]
+
+def _plan_needs(fixtures: List[Fixture]) -> Dict[str, List[Any]]:
+    needs = _needs(fixtures)
+    _fresh_filter(needs)
+    needs[FALLBACK] = _fallback(fixtures, needs)
+    return needs
+
+def _cost(fixtures: List[Fixture], mode: str, needs: Dict[str, List[Any]], day: int = None) -> Tuple[int, float]:
+    odds_calls = odds.odds_cost(fixtures, mode, day)
+    other = sum(len(needs[kind]) for kind in ("predictions", "stats", "standings", FALLBACK))
+    calls = odds_calls + other
+    # bulk strane idu redom, po meču ide paralelno; tempo ipak diktira token bucket
+    serial = odds_calls if mode in ("date", "leagues") else 0
+    parallel = calls - serial
+    latency = serial * EST_LATENCY + math.ceil(parallel / max(api.WORKERS, 1)) * EST_LATENCY
+    paced = max(calls - api.BURST, 0) / api.RATE if api.RATE > 0 else 0.0
+    return calls, max(latency, paced)
+
+def make(date: str = None, fixtures: List[Fixture] = None, shard: Tuple[int, int, str] = None) -> Plan:
+    # shard: (i, n, by) -> samo mečevi koje shard_of dodeljuje workeru i
+    date = date or today_iso()
+    if fixtures is None:
+        fixtures = odds.fixtures_by_date(date)
+    window = _window()
+    skipped: Dict[str, int] = {}
+    scoped = []
+    for f in fixtures:
+        reason = _reject(f, date, window)
+        if reason:
+            skipped[reason] = skipped.get(reason, 0) + 1
+        else:
+            scoped.append(f)
+    scoped.sort(key=order)
+    # /odds?date= se ne filtrira po ligi, terminu ni shardu: u režimu date strane pokrivaju
+    # ceo dan, pa i svaki od n workera lista sve (stub, 300 mečeva: 27 strana za jedan run,
+    # 3 × 27 = 81 za 3 sharda). Procena zato broji strane svih mečeva; leagues/off se ne množe
+    day = len(fixtures)
+    if shard:
+        i, n, by = shard
+        mine = [f for f in scoped if shard_of(f, n, by) == i]
+        skipped["shard"] = len(scoped) - len(mine)
+        scoped = mine
+
+    mode = odds.ODDS_BULK
+    needs = _plan_needs(scoped)
+    calls, est = _cost(_with_odds(scoped, needs), mode, needs, day)
+    if not quota.fits(calls):
+        # kvota ne pokriva ceo plan: poziv po meču i sečenje od najniže prioritetnih;
+        # meč nosi i svoje pozive van kvota koje neki raniji meč već nije platio
+        mode = "off"
+        budget = max((quota.remaining() or 0) - quota.RESERVE, 0)
+        keep, spent = [], 0
+        taken: Dict[str, set] = {}
+        for f in scoped:
+            new = {kind: set(keys) - taken.get(kind, set()) for kind, keys in _plan_needs([f]).items() if kind != "odds"}
+            cost = odds.odds_cost([f], mode) + sum(len(keys) for keys in new.values())
+            if spent + cost <= budget:
+                keep.append(f)
+                spent += cost
+                for kind, keys in new.items():
+                    taken.setdefault(kind, set()).update(keys)
+        skipped["quota"] = len(scoped) - len(keep)
+        scoped = keep
+        needs = _plan_needs(scoped)
+        calls, est = _cost(_with_odds(scoped, needs), mode, needs, day)
+
+    plan = Plan(date, mode, scoped)
+    plan.shard, plan.day = shard, day
+    plan.needs, plan.skipped, plan.calls, plan.est_seconds = needs, skipped, calls, est
+    return plan
+
+def _with_odds(fixtures: List[Fixture], needs: Dict[str, List[Any]]) -> List[Fixture]:
+    wanted = set(needs["odds"])
+    return [f for f in fixtures if f.id in wanted]
+
+def _call(call: Tuple[Any, Tuple]) -> None:
+    fn, args = call
+    try:
+        fn(*args)
+    except Exception:
+        pass  # builder bez predikcije/statistike radi sa onim što ima
+
+def execute_extra(plan: Plan) -> int:
+    # sve osim kvota; generate kvote ne dohvata unapred nego ih čita kroz odds.stream_index
+    extra: List[Any] = [(odds.predictions_by_fixture, (fid,)) for fid in plan.needs["predictions"]]
+    extra += [(odds.teams_statistics, key) for key in plan.needs["stats"]]
+    extra += [(odds.standings_all, key) for key in plan.needs["standings"]]
+    if not extra and not model.ENABLED:
+        return 0
+    with ThreadPoolExecutor(max_workers=max(api.WORKERS, 1)) as pool:
+        list(pool.map(_call, extra))
+        if model.ENABLED:
+            # drugi talas: statistika samo za timove kojih nema u (sad već keširanim) tabelama;
+            # plan.make ga procenjuje kao needs[FALLBACK]
+            wanted = set(plan.needs["stats"])
+            fallback = [(odds.teams_statistics, key) for key in model.uncovered(plan.fixtures) if key not in wanted]
+            list(pool.map(_call, fallback))
+            extra += fallback
+    return len(extra)
+
+def stream(plan: Plan, window: int = None, stats: Dict[str, Any] = None, until: float = None,
+           reuse: Iterable[int] = (), checkpoint=None):
+    # index unosi za plan.fixtures redom kojim kvote stižu (vidi odds.stream_index)
+    return odds.stream_index(plan.date, plan.fixtures, plan.mode, window or odds.STREAM_WINDOW, stats, until,
+                             reuse, checkpoint, plan.day)
+
+def describe(plan: Plan) -> str:
+    d = plan.to_dict()
+    needs = ", ".join(f"{k}={v}" for k, v in d["needs"].items())
+    skipped = ", ".join(f"{k}={v}" for k, v in d["skipped"].items()) or "-"
+    return (
+        f"{d['date']}: {d['fixtures']} fixtures ({needs}), skipped {skipped}; "
+        f"mode={d['mode']} calls={d['calls']} est={d['est_seconds']}s"
+    )
@@ -0,0 +1,110 @@
+# src/publish.py
+# jedno mesto za upis feedova u public/: kompaktno, atomično, sa .gz/.br i manifestom
+import gzip, hashlib, json, os, threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from . import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PUBLIC_DIR = os.getenv("FF_PUBLIC_DIR") or os.path.join(os.path.dirname(os.path.dirname(__file__)), "public")
+PRETTY = os.getenv("PUBLISH_PRETTY", "0") == "1"  # čitljiv izlaz za debug
+COMPRESS = os.getenv("PUBLISH_COMPRESS", "1") == "1"
+MANIFEST = "manifest.json"
+os.makedirs(PUBLIC_DIR, exist_ok=True)
+
+_lock = threading.Lock()
+_manifests: Dict[str, Dict[str, Any]] = {}
+_dirty = set()
+
+def dumps(data: Any) -> bytes:
+    if PRETTY:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _atomic_write(fp: str, body: bytes) -> None:
+    tmp = f"{fp}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(body)
+    os.replace(tmp, fp)
+
+def _manifest(directory: str) -> Dict[str, Any]:
+    if directory not in _manifests:
+        try:
+            with open(os.path.join(directory, MANIFEST), "r", encoding="utf-8") as f:
+                _manifests[directory] = json.load(f)
+        except (OSError, ValueError):
+            _manifests[directory] = {"files": {}}
+    return _manifests[directory]
+
+def _siblings() -> Dict[str, str]:
+    # kompresovane kopije koje ovaj run piše: manifest ključ -> sufiks fajla
+    if not COMPRESS:
+        return {}
+    return {"gzip_bytes": ".gz", **({"br_bytes": ".br"} if brotli is not None else {})}
+
+def _unchanged(fp: str, entry: Optional[Dict[str, Any]], digest: str, size: int) -> bool:
+    if not entry or entry.get("sha256") != digest:
+        return False
+    # isti sadržaj, ali uključena/isključena kompresija: fajl se piše ponovo
+    if {k for k in ("gzip_bytes", "br_bytes") if k in entry} != _siblings().keys():
+        return False
+    try:
+        return os.path.getsize(fp) == size
+    except OSError:
+        return False
+
+@metrics.timed("write")
+def write(name: str, data: Any, directory: str = PUBLIC_DIR) -> bool:
+    body = dumps(data)
+    digest = hashlib.sha256(body).hexdigest()
+    fp = os.path.join(directory, name)
+    with _lock:
+        os.makedirs(directory, exist_ok=True)
+        files = _manifest(directory)["files"]
+        if _unchanged(fp, files.get(name), digest, len(body)):
+            metrics.count("publish", "files_skipped")
+            return False
+        entry = {"sha256": digest, "bytes": len(body)}
+        # siblings prvi, pa tek onda glavni fajl: ko vidi novi hash, nalazi i nove .gz/.br
+        if COMPRESS:
+            gz = gzip.compress(body, compresslevel=9, mtime=0)
+            _atomic_write(fp + ".gz", gz)
+            entry["gzip_bytes"] = len(gz)
+            if brotli is not None:
+                br = brotli.compress(body)
+                _atomic_write(fp + ".br", br)
+                entry["br_bytes"] = len(br)
+        for suffix in {".gz", ".br"} - set(_siblings().values()):
+            # stara kopija bi posluživala zastareo sadržaj
+            try:
+                os.remove(fp + suffix)
+            except FileNotFoundError:
+                pass
+        _atomic_write(fp, body)
+        metrics.count("publish", "files_written")
+        metrics.count("publish", "bytes_written", len(body) + entry.get("gzip_bytes", 0) + entry.get("br_bytes", 0))
+        entry["updated_at"] = datetime.now(timezone.utc).isoformat()
+        files[name] = entry
+        _dirty.add(directory)
+        return True
+
+def flush(directory: str = PUBLIC_DIR) -> None:
+    with _lock:
+        if directory not in _dirty:
+            return
+        _dirty.discard(directory)
+        manifest = _manifest(directory)
+        manifest["generated_at"] = datetime.now(timezone.utc).isoformat()
+        body = json.dumps(manifest, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+        _atomic_write(os.path.join(directory, MANIFEST), body.encode("utf-8"))
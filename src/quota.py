@@ -0,0 +1,104 @@
+# src/quota.py
+# dnevni ledger API-Football kvote, preživljava između jutarnjeg/večernjeg posla
+import atexit, fcntl, json, os, threading, time
+from typing import Any, Dict, Optional
+from .util import STATE_DIR, today_iso
+
+LEDGER_PATH = os.path.join(STATE_DIR, "quota.json")
+DAILY_LIMIT = int(os.getenv("API_FOOTBALL_DAILY_LIMIT", "0")) or None  # kad API ne vrati header
+RESERVE = int(os.getenv("API_FOOTBALL_RESERVE", "10"))  # ostavi za evaluate i ručne pozive
+SAVE_EVERY = 5.0
+
+_lock = threading.Lock()
+_ledger: Optional[Dict[str, Any]] = None
+_last_save = 0.0
+_unsaved = 0  # pozivi ovog procesa koji još nisu upisani u fajl
+
+def _read() -> Dict[str, Any]:
+    try:
+        with open(LEDGER_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _load() -> Dict[str, Any]:
+    global _ledger, _unsaved
+    if _ledger is None:
+        _ledger = _read()
+    if _ledger.get("day") != today_iso():
+        # API-Football resetuje dnevnu kvotu u 00:00 UTC
+        limit = _ledger.get("limit") or DAILY_LIMIT
+        _ledger = {"day": today_iso(), "limit": limit, "remaining": limit, "used": 0}
+        _unsaved = 0
+    return _ledger
+
+def _merge(disk: Dict[str, Any], own: Dict[str, Any]) -> Dict[str, Any]:
+    # više procesa (backfill) deli ledger: used se sabira, limit/remaining važe iz svežijeg zapisa
+    if disk.get("day") != own["day"]:
+        return disk if (disk.get("day") or "") > own["day"] else dict(own)
+    merged = dict(disk)
+    merged["used"] = disk.get("used", 0) + _unsaved
+    if own.get("updated", 0) >= disk.get("updated", 0):
+        for key in ("limit", "remaining", "updated"):
+            if key in own:
+                merged[key] = own[key]
+    return merged
+
+def _save(force: bool = False) -> None:
+    # čitaj-spoji-piši pod flock-om; tmp fajl po procesu, pa os.replace nikad ne nađe tuđ tmp
+    global _last_save, _ledger, _unsaved
+    if _ledger is None or (not force and time.time() - _last_save < SAVE_EVERY):
+        return
+    os.makedirs(STATE_DIR, exist_ok=True)
+    with open(LEDGER_PATH + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            merged = _merge(_read(), _ledger)
+            tmp = f"{LEDGER_PATH}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(merged, f)
+            os.replace(tmp, LEDGER_PATH)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    _ledger, _unsaved = merged, 0
+    _last_save = time.time()
+
+def observe(limit: Optional[int], remaining: Optional[int]) -> None:
+    global _unsaved
+    with _lock:
+        led = _load()
+        led["used"] += 1
+        _unsaved += 1
+        if limit is not None:
+            led["limit"] = limit
+        if remaining is not None:
+            led["remaining"] = remaining
+        elif led["limit"] is not None:
+            led["remaining"] = max(led["limit"] - led["used"], 0)
+        led["updated"] = time.time()
+        _save()
+
+def remaining() -> Optional[int]:
+    with _lock:
+        return _load().get("remaining")
+
+def exhaust() -> None:
+    with _lock:
+        led = _load()
+        led["remaining"] = 0
+        led["updated"] = time.time()
+        _save(force=True)
+
+def fits(calls: int) -> bool:
+    left = remaining()
+    return left is None or calls <= left - RESERVE
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        return dict(_load())
+
+def flush() -> None:
+    with _lock:
+        _save(force=True)
+
+atexit.register(flush)
@@ -0,0 +1,149 @@
+# src/settle.py
+# konačni rezultati u paketima od po 20 (/fixtures?ids=) i obračun legova po marketu
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from . import api, cache
+
+IDS_PER_CALL = 20  # API-Football limit za /fixtures?ids=
+SETTLE_AFTER = 2 * 3600  # pre početka + 2h nema smisla pitati za rezultat
+RESULT_TTL = 10 * 365 * 24 * 3600
+
+FINISHED = {"FT", "AET", "PEN"}
+VOID = {"PST", "CANC", "ABD", "AWD", "WO"}
+
+WON, LOST, VOIDED, PENDING = "✅", "❌", "void", "pending"
+SETTLED = {WON, LOST, VOIDED}
+
+def _legs(doc: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+    yield from doc.get("legs", [])
+    for t in doc.get("tickets", []):
+        yield from t.get("legs", [])
+
+def _due(leg: Dict[str, Any], now: float) -> bool:
+    kickoff = leg.get("kickoff")
+    if not kickoff:
+        return True  # stari feedovi nemaju kickoff, pitamo
+    try:
+        return datetime.fromisoformat(kickoff).timestamp() + SETTLE_AFTER <= now
+    except ValueError:
+        return True
+
+def unsettled_fixture_ids(docs: Iterable[Optional[Dict[str, Any]]], now: float = None) -> List[int]:
+    # samo mečevi sa bar jednim neobračunatim legom kojima je prošlo početak + 2h
+    now = now or time.time()
+    ids = set()
+    for doc in docs:
+        for leg in _legs(doc or {}):
+            if leg.get("fixture_id") is None or leg.get("market") == "ANALYSIS":
+                continue
+            if leg.get("result") in SETTLED or not _due(leg, now):
+                continue
+            ids.add(int(leg["fixture_id"]))
+    return sorted(ids)
+
+def known_results(fids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    results = {}
+    for fid in fids:
+        r = cache.get(f"result_{fid}", RESULT_TTL)
+        if r is not None:
+            results[fid] = r
+    return results
+
+def _result(f: Dict[str, Any]) -> Dict[str, Any]:
+    # kladionice obračunavaju posle 90 minuta, pa score.fulltime ima prednost nad goals
+    ft = (f.get("score") or {}).get("fulltime") or {}
+    goals = f.get("goals") or {}
+    home = ft.get("home") if ft.get("home") is not None else goals.get("home")
+    away = ft.get("away") if ft.get("away") is not None else goals.get("away")
+    return {"status": f["fixture"]["status"]["short"], "home": home, "away": away}
+
+def fetch_results(fids: List[int]) -> Dict[int, Dict[str, Any]]:
+    batches = [fids[i:i + IDS_PER_CALL] for i in range(0, len(fids), IDS_PER_CALL)]
+    responses = api.get_many(
+        ("/fixtures", {"ids": "-".join(str(fid) for fid in batch)}) for batch in batches
+    )
+    results: Dict[int, Dict[str, Any]] = {}
+    for data in responses:
+        if isinstance(data, Exception):
+            continue
+        for f in data.get("response", []):
+            r = results[f["fixture"]["id"]] = _result(f)
+            if r["status"] in FINISHED | VOID:
+                cache.set(f"result_{f['fixture']['id']}", r)
+    return results
+
+def results_for(fids: List[int]) -> Dict[int, Dict[str, Any]]:
+    # indeks konačnih rezultata prvo, API samo za ono što još nije završeno
+    results = known_results(fids)
+    results.update(fetch_results([fid for fid in fids if fid not in results]))
+    return results
+
+def _hit(market: str, pick: str, home: int, away: int) -> Optional[bool]:
+    total = home + away
+    if market == "DC":
+        return {
+            "Home/Draw": home >= away, "1X": home >= away,
+            "Home/Away": home != away, "12": home != away,
+            "Draw/Away": home <= away, "X2": home <= away,
+        }.get(pick)
+    if market == "MW":
+        return {
+            "Home": home > away, "1": home > away,
+            "Draw": home == away, "X": home == away,
+            "Away": home < away, "2": home < away,
+        }.get(pick)
+    if market == "BTTS":
+        both = home > 0 and away > 0
+        return {"BTTS Yes": both, "Yes": both, "BTTS No": not both, "No": not both}.get(pick)
+    if market == "OU":
+        side, _, line = pick.partition(" ")
+        try:
+            line_f = float(line)
+        except ValueError:
+            return None
+        if side == "Over":
+            return total > line_f
+        if side == "Under":
+            return total < line_f
+    return None
+
+def settle_leg(leg: Dict[str, Any], result: Optional[Dict[str, Any]]) -> str:
+    if leg.get("result") in SETTLED:
+        return leg["result"]
+    if result is None:
+        return PENDING
+    if result["status"] in VOID:
+        return VOIDED
+    if result["status"] not in FINISHED or result["home"] is None or result["away"] is None:
+        return PENDING
+    hit = _hit(leg.get("market", ""), leg.get("pick", ""), result["home"], result["away"])
+    if hit is None:
+        return PENDING
+    return WON if hit else LOST
+
+def ticket_status(leg_results: List[str]) -> str:
+    if not leg_results or PENDING in leg_results:
+        return PENDING
+    if LOST in leg_results:
+        return LOST
+    if all(r == VOIDED for r in leg_results):
+        return VOIDED
+    return WON
+
+def settle_doc(doc: Dict[str, Any], results: Dict[int, Dict[str, Any]]) -> None:
+    for leg in doc.get("legs", []):
+        if leg.get("market") != "ANALYSIS" and "fixture_id" in leg:
+            leg["result"] = settle_leg(leg, results.get(int(leg["fixture_id"])))
+    for t in doc.get("tickets", []):
+        outcomes = []
+        settled_odds = 1.0
+        for leg in t.get("legs", []):
+            leg["result"] = settle_leg(leg, results.get(int(leg["fixture_id"])))
+            outcomes.append(leg["result"])
+            if leg["result"] != VOIDED:
+                settled_odds *= float(leg.get("odds", 1.0))
+        t["status"] = ticket_status(outcomes)
+        if VOIDED in outcomes:
+            # void leg ispada iz tiketa, kvota se računa bez njega
+            t["settled_odds"] = round(settled_odds, 2)
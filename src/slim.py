@@ -0,0 +1,90 @@
+# src/slim.py
+# projekcije /fixtures i /odds odgovora na polja koja pipeline stvarno čita: u kešu su
+# kompaktni redovi (mečevi) i kolone (kvote), u memoriji __slots__ zapisi;
+# ceo sirov odgovor se čuva samo uz CACHE_KEEP_RAW=1 (ključ raw_<ključ>)
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+KEEP_RAW = os.getenv("CACHE_KEEP_RAW", "0") == "1"
+
+class Fixture:
+    # redosled polja je i redosled kolona u kešu (row / from_row)
+    __slots__ = (
+        "id", "timestamp", "kickoff", "status",
+        "league_id", "league_name", "season",
+        "home_id", "home", "away_id", "away",
+    )
+
+    def __init__(self, id: int, timestamp: Optional[int], kickoff: Optional[str], status: Optional[str],
+                 league_id: int, league_name: str, season: Optional[int],
+                 home_id: Optional[int], home: str, away_id: Optional[int], away: str):
+        self.id = id
+        self.timestamp = timestamp
+        self.kickoff = kickoff
+        self.status = status
+        self.league_id = league_id
+        self.league_name = league_name
+        self.season = season
+        self.home_id = home_id
+        self.home = home
+        self.away_id = away_id
+        self.away = away
+
+    @classmethod
+    def from_api(cls, f: Dict[str, Any]) -> "Fixture":
+        fx = f.get("fixture") or {}
+        league = f.get("league") or {}
+        teams = f.get("teams") or {}
+        home, away = teams.get("home") or {}, teams.get("away") or {}
+        return cls(
+            fx.get("id"), fx.get("timestamp"), fx.get("date"), (fx.get("status") or {}).get("short"),
+            league.get("id"), league.get("name"), league.get("season"),
+            home.get("id"), home.get("name"), away.get("id"), away.get("name"),
+        )
+
+    @classmethod
+    def from_row(cls, row: List[Any]) -> "Fixture":
+        return cls(*row)
+
+    def row(self) -> List[Any]:
+        return [getattr(self, name) for name in self.__slots__]
+
+    def __repr__(self) -> str:
+        return f"Fixture({self.id}, {self.home!r} vs {self.away!r}, league={self.league_id})"
+
+def fixture_rows(response: Iterable[Dict[str, Any]]) -> List[List[Any]]:
+    # /fixtures response -> redovi za keš
+    return [Fixture.from_api(f).row() for f in response]
+
+def fixtures(value: Iterable[Any]) -> List[Fixture]:
+    # redovi iz keša; stari unosi (pun /fixtures response) se projektuju pri čitanju
+    return [Fixture.from_row(v) if isinstance(v, list) else Fixture.from_api(v) for v in value or []]
+
+def odds(item: Dict[str, Any], aliases: Dict[str, str]) -> Dict[str, Any]:
+    # jedan /odds unos -> kolone (kladionica, market, selekcija, kvota) samo za markete
+    # iz aliases; market je već sveden na naš ključ, kvota je float
+    if not item or "bookmakers" not in item:
+        return item or {}  # prazno ili već projektovano
+    b: List[Any] = []
+    m: List[str] = []
+    s: List[str] = []
+    o: List[float] = []
+    for book in item["bookmakers"]:
+        for bet in book.get("bets", []):
+            market = aliases.get(bet.get("name"))
+            if not market:
+                continue
+            for v in bet.get("values", []):
+                try:
+                    odd = float(v.get("odd", ""))
+                except (TypeError, ValueError):
+                    continue
+                b.append(book.get("id"))
+                m.append(market)
+                s.append(str(v.get("value")))
+                o.append(odd)
+    return {
+        "fixture": (item.get("fixture") or {}).get("id"),
+        "update": item.get("update"),
+        "b": b, "m": m, "s": s, "o": o,
+    }
@@ -0,0 +1,273 @@
+# src/snapshots.py
+# istorija kvota po danu: red (vreme, meč, slot, kladionica, kvota) upisuje se samo kad se
+# cena promeni, pa skladište raste sa kretanjem kvota a ne sa brojem run-ova; diff između
+# dva trenutka, drift od otvaranja po selekciji i movements.json delta feed
+#
+#   python -m src.snapshots 2026-10-18 --since 2026-10-18T08:00
+import argparse, fcntl, json, os, threading, time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from . import analytics, metrics, publish
+from .util import DATA_DIR
+
+SNAPSHOT_DIR = os.getenv("FF_SNAPSHOT_DIR") or os.path.join(DATA_DIR, "snapshots")
+MOVEMENTS_FEED = "movements.json"
+ENABLED = os.getenv("SNAPSHOTS", "1") == "1"
+MAX_DRIFT = float(os.getenv("MAX_DRIFT", "0"))  # npr. 0.10: builderi preskaču selekcije pomerene >10%; 0 = isključeno
+MOVE_MIN = float(os.getenv("MOVE_MIN", "0.05"))  # najmanji drift koji ulazi u movements.json
+
+# slot je indeks u analytics.SLOTS (novi slotovi se dodaju na kraj, pa stari kodovi važe);
+# kvota je u hiljaditim delovima, 0 = kladionica je povukla cenu
+COLUMNS: List[Tuple[str, str]] = [
+    ("ts", "<f8"), ("fixture_id", "<i8"), ("slot", "<i2"), ("book", "<i4"), ("odd", "<i4"),
+]
+Key = Tuple[int, int, int]  # (meč, slot, kladionica)
+
+_lock = threading.Lock()
+_days: Dict[str, "_Day"] = {}
+
+def _path(date: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, date)
+
+def _read(date: str) -> Dict[str, np.ndarray]:
+    # prekinut append ostavlja kolone različite dužine: važi najkraća
+    path = _path(date)
+    sizes = []
+    for name, dtype in COLUMNS:
+        fp = os.path.join(path, f"{name}.bin")
+        sizes.append(os.path.getsize(fp) // np.dtype(dtype).itemsize if os.path.exists(fp) else 0)
+    rows = min(sizes)
+    if not rows:
+        return {name: np.empty(0, dtype) for name, dtype in COLUMNS}
+    return {
+        name: np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode="r", shape=(rows,))
+        for name, dtype in COLUMNS
+    }
+
+def _append(date: str, rows: List[Tuple[float, int, int, int, int]]) -> None:
+    path = _path(date)
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            n = len(_read(date)["ts"])
+            for i, (name, dtype) in enumerate(COLUMNS):
+                fp = os.path.join(path, f"{name}.bin")
+                with open(fp, "r+b" if os.path.exists(fp) else "wb") as f:
+                    f.truncate(n * np.dtype(dtype).itemsize)  # odseci ostatak prekinutog appenda
+                    f.seek(0, os.SEEK_END)
+                    f.write(np.array([r[i] for r in rows], dtype=dtype).tobytes())
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+class _Day:
+    # poslednja i prva cena po ključu za jedan dan, učitane jednom po procesu
+    def __init__(self, date: str):
+        cols = _read(date)
+        self.last: Dict[Key, int] = {}
+        self.open: Dict[Key, int] = {}
+        self.keys: Dict[int, Set[Key]] = {}
+        for fid, slot, book, odd in zip(*(cols[c].tolist() for c in ("fixture_id", "slot", "book", "odd"))):
+            self._seen((fid, slot, book), odd)
+        # poslednji snimak pre ovog procesa: odatle movements.json računa promene
+        self.since: Optional[float] = float(cols["ts"][-1]) if len(cols["ts"]) else None
+
+    def _seen(self, key: Key, odd: int) -> None:
+        self.last[key] = odd
+        if odd and key not in self.open:
+            self.open[key] = odd
+        self.keys.setdefault(key[0], set()).add(key)
+
+    def drift(self, fid: int) -> Dict[int, float]:
+        # slot -> prosečna promena od otvaranja, samo kladionice koje cenu imaju i sad
+        ratios: Dict[int, List[float]] = {}
+        for key in self.keys.get(fid, ()):
+            now, first = self.last[key], self.open.get(key)
+            if now and first:
+                ratios.setdefault(key[1], []).append(now / first)
+        return {slot: sum(r) / len(r) - 1.0 for slot, r in ratios.items()}
+
+def _day(date: str) -> _Day:
+    with _lock:
+        if date not in _days:
+            _days[date] = _Day(date)
+        return _days[date]
+
+def _milli(odd: float) -> int:
+    return int(round(odd * 1000))
+
+def record(date: str, odds: Iterable[Tuple[int, Dict[str, Any]]], ts: float = None) -> int:
+    # (meč, slim.odds projekcija) -> redovi samo za nove, promenjene i povučene cene
+    day = _day(date)
+    ts = ts or time.time()
+    rows: List[Tuple[float, int, int, int, int]] = []
+    with _lock:
+        for fid, o in odds:
+            if not o:
+                continue
+            seen: Set[Key] = set()
+            for b, m, sel, odd in zip(o["b"], o["m"], o["s"], o["o"]):
+                slot = analytics.SLOT.get((m, sel))
+                if slot is None:
+                    continue
+                key = (fid, slot, int(b or 0))
+                seen.add(key)
+                milli = _milli(odd)
+                if day.last.get(key) != milli:
+                    rows.append((ts, *key, milli))
+                    day._seen(key, milli)
+            # bila je u prošlom snimku, sad je nema: kladionica je povukla cenu
+            for key in day.keys.get(fid, set()) - seen:
+                if day.last[key]:
+                    rows.append((ts, *key, 0))
+                    day._seen(key, 0)
+        if rows:
+            _append(date, rows)
+    metrics.count("snapshots", "rows", len(rows))
+    return len(rows)
+
+def annotate(date: str, index: List[Dict[str, Any]]) -> None:
+    # upisuje drift od otvaranja u index (markets[m][sel]["drift"]) gde ga ima
+    day = _day(date)
+    for e in index:
+        drift = day.drift(e["fixture_id"])
+        if not drift:
+            continue
+        for market, sels in e["markets"].items():
+            for sel, price in sels.items():
+                d = drift.get(analytics.SLOT.get((market, sel)))
+                if d is not None:
+                    price["drift"] = round(d, 4)
+
+def drifted(price: Dict[str, Any]) -> bool:
+    # filter za buildere: cena se od otvaranja pomerila više od MAX_DRIFT (u bilo kom smeru)
+    return bool(MAX_DRIFT) and abs(price.get("drift", 0.0)) > MAX_DRIFT
+
+def _fids(cols: Dict[str, np.ndarray]) -> np.ndarray:
+    # ključ nosi indeks meča u ovom nizu, ne sam id: id << 24 ne staje u int64 za id >= 2**39
+    return np.unique(np.asarray(cols["fixture_id"]))
+
+def _state(cols: Dict[str, np.ndarray], until: Optional[float]) -> Tuple[np.ndarray, np.ndarray]:
+    # (ključevi, kvota) u trenutku until: poslednji red po ključu sa ts <= until;
+    # ključevi se porede samo za isti cols, meč je _fids(cols)[k >> 24]
+    sel = np.ones(len(cols["ts"]), dtype=bool) if until is None else np.asarray(cols["ts"]) <= until
+    fid = np.searchsorted(_fids(cols), np.asarray(cols["fixture_id"])[sel]).astype("<i8")
+    key = (
+        (fid << 24)
+        | (np.asarray(cols["slot"])[sel].astype("<i8") << 16)
+        | (np.asarray(cols["book"])[sel].astype("<i8") & 0xFFFF)
+    )
+    odd = np.asarray(cols["odd"])[sel]
+    # redovi su u redosledu upisa, pa je poslednji red ključa prvi u obrnutom nizu
+    uniq, first = np.unique(key[::-1], return_index=True)
+    return uniq, odd[::-1][first]
+
+def _label(slot: int) -> Tuple[str, str]:
+    return analytics.SLOTS[slot] if 0 <= slot < len(analytics.SLOTS) else ("?", str(slot))
+
+def diff(date: str, since: Optional[float], until: Optional[float] = None) -> List[Dict[str, Any]]:
+    # promene cena po kladionici između dva trenutka (None = početak / sad)
+    cols = _read(date)
+    new_keys, new_odds = _state(cols, until)
+    if since is None:
+        old_keys, old_odds = new_keys[:0], new_odds[:0]
+    else:
+        old_keys, old_odds = _state(cols, since)
+    pos = np.searchsorted(old_keys, new_keys)
+    pos[pos >= len(old_keys)] = 0
+    known = (old_keys[pos] == new_keys) if len(old_keys) else np.zeros(len(new_keys), dtype=bool)
+    before = np.where(known, old_odds[pos] if len(old_keys) else 0, 0)
+    changed = before != new_odds
+    fids = _fids(cols).tolist()
+    out = []
+    for k, a, b in zip(new_keys[changed].tolist(), before[changed].tolist(), new_odds[changed].tolist()):
+        market, pick = _label((k >> 16) & 0xFF)
+        out.append({
+            "fixture_id": fids[k >> 24], "market": market, "pick": pick, "book": k & 0xFFFF,
+            "from": a / 1000 if a else None, "to": b / 1000 if b else None,
+        })
+    return out
+
+def _best(rows: Iterable[Tuple[Tuple[int, str, str], Optional[float]]]) -> Dict[Tuple[int, str, str], float]:
+    best: Dict[Tuple[int, str, str], float] = {}
+    for sel, odd in rows:
+        if odd and odd > best.get(sel, 0.0):
+            best[sel] = odd
+    return best
+
+def movements(date: str, since: Optional[float] = None, fixtures: Iterable[int] = None) -> Dict[str, Any]:
+    # delta od since (podrazumevano poslednji snimak pre ovog procesa) i drift od otvaranja;
+    # fixtures: samo ti mečevi (shard generate-a objavljuje samo svoje)
+    day = _day(date)
+    since = day.since if since is None else since
+    only = set(fixtures) if fixtures is not None else None
+    changes = []
+    if since is not None:
+        rows = [r for r in diff(date, since) if only is None or r["fixture_id"] in only]
+        if rows:
+            cols = _read(date)
+            before = {(r["fixture_id"], r["market"], r["pick"]) for r in rows}
+            old_keys, old_odds = _state(cols, since)
+            new_keys, new_odds = _state(cols, None)
+            fids = _fids(cols).tolist()
+
+            def selections(keys, odds):
+                for k, odd in zip(keys.tolist(), odds.tolist()):
+                    sel = (fids[k >> 24], *_label((k >> 16) & 0xFF))
+                    if sel in before:
+                        yield sel, odd / 1000
+
+            old, new = _best(selections(old_keys, old_odds)), _best(selections(new_keys, new_odds))
+            for sel in sorted(before):
+                if old.get(sel) != new.get(sel):
+                    changes.append({
+                        "fixture_id": sel[0], "market": sel[1], "pick": sel[2],
+                        "from": old.get(sel), "to": new.get(sel),
+                    })
+    drift = []
+    for fid in sorted(day.keys if only is None else only & day.keys.keys()):
+        for slot, d in sorted(day.drift(fid).items()):
+            if abs(d) >= MOVE_MIN:
+                market, pick = _label(slot)
+                drift.append({"fixture_id": fid, "market": market, "pick": pick, "drift": round(d, 4)})
+    drift.sort(key=lambda r: -abs(r["drift"]))
+    return {
+        "date": date,
+        "since": datetime.fromtimestamp(since, timezone.utc).isoformat() if since else None,
+        "changes": changes,
+        "drift": drift,
+    }
+
+def merge_movements(date: str, docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # movements delova dana (shardovi, svaki sa svojim mečevima) -> isti dokument kao jedan run
+    def slot(r: Dict[str, Any]) -> int:
+        return analytics.SLOT.get((r["market"], r["pick"]), len(analytics.SLOTS))
+
+    since = [d["since"] for d in docs if d.get("since")]
+    changes = sorted((r for d in docs for r in d["changes"]), key=lambda r: (r["fixture_id"], r["market"], r["pick"]))
+    drift = sorted((r for d in docs for r in d["drift"]), key=lambda r: (-abs(r["drift"]), r["fixture_id"], slot(r)))
+    return {"date": date, "since": min(since) if since else None, "changes": changes, "drift": drift}
+
+def publish_movements(date: str, directory: str = None, doc: Dict[str, Any] = None) -> bool:
+    # doc: već spojen dokument (generate --merge); inače iz lokalnog skladišta
+    now = time.time()
+    doc = dict(doc) if doc is not None else movements(date)
+    doc["generated_at"] = datetime.fromtimestamp(now, timezone.utc).isoformat()
+    # sledeći feed iz istog procesa (bench, watch) nosi promene od ovog
+    _day(date).since = now
+    return publish.write(MOVEMENTS_FEED, doc, directory or publish.PUBLIC_DIR)
+
+def _ts(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    dt = datetime.fromisoformat(value)
+    return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="promene kvota između dva trenutka za jedan dan")
+    ap.add_argument("date", help="YYYY-MM-DD")
+    ap.add_argument("--since", help="ISO vreme (UTC), podrazumevano od prvog snimka")
+    ap.add_argument("--until", help="ISO vreme (UTC), podrazumevano sad")
+    args = ap.parse_args()
+    print(json.dumps(diff(args.date, _ts(args.since), _ts(args.until)), ensure_ascii=False, indent=2))
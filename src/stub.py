@@ -0,0 +1,368 @@
+# src/stub.py
+# lokalni API-Football stand-in za offline merenje (bez ključa i bez kvote)
+import argparse, json, random, threading, time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+LEAGUES = [
+    (39, "Premier League"),
+    (140, "La Liga"),
+    (78, "Bundesliga"),
+    (135, "Serie A"),
+    (61, "Ligue 1"),
+    (218, "Bundesliga (AUT)"),
+    (106, "Ekstraklasa"),
+    (286, "Super Liga (SRB)"),
+]
+PAGE_SIZE = 10
+
+def synthetic_fixtures(date: str, n: int, seed: int = 1) -> List[Dict[str, Any]]:
+    base = datetime.fromisoformat(date).replace(hour=12, tzinfo=timezone.utc)
+    out = []
+    for i in range(n):
+        fid = seed * 1_000_000 + i
+        league_id, league_name = LEAGUES[i % len(LEAGUES)]
+        ko = base + timedelta(minutes=15 * (i % 40))
+        out.append({
+            "fixture": {
+                "id": fid,
+                "referee": None,
+                "timezone": "UTC",
+                "date": ko.isoformat(),
+                "timestamp": int(ko.timestamp()),
+                "venue": {"id": None, "name": "Stadium", "city": "City"},
+                "status": {"long": "Not Started", "short": "NS", "elapsed": None},
+            },
+            "league": {"id": league_id, "name": league_name, "country": "X", "season": 2025, "round": "Regular Season - 1"},
+            "teams": {
+                "home": {"id": 2 * i + 1, "name": f"Home {i}", "logo": ""},
+                "away": {"id": 2 * i + 2, "name": f"Away {i}", "logo": ""},
+            },
+            "goals": {"home": None, "away": None},
+            "score": {"halftime": {"home": None, "away": None}, "fulltime": {"home": None, "away": None}},
+        })
+    return out
+
+def _price(rnd: random.Random, p: float, margin: float) -> str:
+    return f"{max(1.01, rnd.uniform(0.97, 1.03) / (p * margin)):.2f}"
+
+def synthetic_odds(fixture: Dict[str, Any], bookmakers: int = 20) -> Optional[Dict[str, Any]]:
+    fid = fixture["fixture"]["id"]
+    if fid % 9 == 0:
+        return None  # deo mečeva nema kvote, kao u pravom API-ju
+    rnd = random.Random(fid)
+    ph, pd = rnd.uniform(0.2, 0.6), rnd.uniform(0.2, 0.3)
+    pa = 1 - ph - pd
+    pb, po15, po25 = rnd.uniform(0.4, 0.65), rnd.uniform(0.65, 0.85), rnd.uniform(0.4, 0.6)
+    books = []
+    for b in range(bookmakers):
+        m = rnd.uniform(1.03, 1.09)
+        books.append({"id": b + 1, "name": f"Book {b + 1}", "bets": [
+            {"id": 1, "name": "Match Winner", "values": [
+                {"value": "Home", "odd": _price(rnd, ph, m)},
+                {"value": "Draw", "odd": _price(rnd, pd, m)},
+                {"value": "Away", "odd": _price(rnd, pa, m)},
+            ]},
+            {"id": 12, "name": "Double Chance", "values": [
+                {"value": "Home/Draw", "odd": _price(rnd, ph + pd, m)},
+                {"value": "Home/Away", "odd": _price(rnd, ph + pa, m)},
+                {"value": "Draw/Away", "odd": _price(rnd, pd + pa, m)},
+            ]},
+            {"id": 8, "name": "Both Teams Score", "values": [
+                {"value": "Yes", "odd": _price(rnd, pb, m)},
+                {"value": "No", "odd": _price(rnd, 1 - pb, m)},
+            ]},
+            {"id": 5, "name": "Goals Over/Under", "values": [
+                {"value": "Over 1.5", "odd": _price(rnd, po15, m)},
+                {"value": "Under 1.5", "odd": _price(rnd, 1 - po15, m)},
+                {"value": "Over 2.5", "odd": _price(rnd, po25, m)},
+                {"value": "Under 2.5", "odd": _price(rnd, 1 - po25, m)},
+            ]},
+            {"id": 45, "name": "Corners Over Under", "values": [
+                {"value": "Over 9.5", "odd": _price(rnd, 0.5, m)},
+            ]},
+        ]})
+    return {"league": fixture["league"], "fixture": {"id": fid, "date": fixture["fixture"]["date"]}, "bookmakers": books}
+
+def _team_goals(team: int) -> Dict[str, float]:
+    # stabilna "forma" tima: golovi po utakmici kod kuće i u gostima
+    rnd = random.Random(team * 7919)
+    return {
+        "home_for": rnd.uniform(0.8, 2.2), "home_against": rnd.uniform(0.6, 1.8),
+        "away_for": rnd.uniform(0.6, 1.8), "away_against": rnd.uniform(0.8, 2.2),
+    }
+
+def synthetic_standings(league: int, season: int, teams: List[Dict[str, Any]], played: int = 10) -> Dict[str, Any]:
+    rows = []
+    for rank, t in enumerate(sorted(teams, key=lambda t: t["id"]), 1):
+        g = _team_goals(t["id"])
+        rows.append({
+            "rank": rank,
+            "team": {"id": t["id"], "name": t["name"]},
+            "all": {"played": 2 * played},
+            "home": {"played": played, "goals": {
+                "for": round(g["home_for"] * played), "against": round(g["home_against"] * played)}},
+            "away": {"played": played, "goals": {
+                "for": round(g["away_for"] * played), "against": round(g["away_against"] * played)}},
+        })
+    return {"league": {"id": league, "season": season, "standings": [rows]}}
+
+def synthetic_team_statistics(team: int, played: int = 10) -> Dict[str, Any]:
+    g = _team_goals(team)
+    return {
+        "team": {"id": team},
+        "fixtures": {"played": {"home": played, "away": played, "total": 2 * played}},
+        "goals": {
+            "for": {"average": {"home": f"{g['home_for']:.1f}", "away": f"{g['away_for']:.1f}"}},
+            "against": {"average": {"home": f"{g['home_against']:.1f}", "away": f"{g['away_against']:.1f}"}},
+        },
+    }
+
+def synthetic_h2h(home: int, away: int, last: int) -> List[Dict[str, Any]]:
+    rnd = random.Random(home * 100_003 + away)
+    return [
+        {"teams": {"home": {"id": home}, "away": {"id": away}},
+         "goals": {"home": rnd.choice([0, 1, 1, 2, 3]), "away": rnd.choice([0, 0, 1, 2])}}
+        for _ in range(last)
+    ]
+
+# liga bez tabele (kup): model za nju ide na /teams/statistics
+NO_STANDINGS = {286}
+
+class StubState:
+    def __init__(self, fixtures: int = 100, bookmakers: int = 20, latency: float = 0.0, error_rate: float = 0.0,
+                 daily_limit: int = 0, minute_limit: int = 0):
+        self.fixtures = fixtures
+        self.bookmakers = bookmakers
+        self.latency = latency
+        self.error_rate = error_rate
+        self.daily_limit = daily_limit
+        self.minute_limit = minute_limit
+        self._minute: List[float] = []
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._days: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        self._odds: Dict[str, List[Dict[str, Any]]] = {}
+        # odgovori koji idu pre pravih (testovi): (status, headeri, telo; bytes = ne-JSON)
+        self._faults: List[Tuple[int, Dict[str, str], Any]] = []
+
+    def inject(self, status: int, times: int = 1, headers: Optional[Dict[str, str]] = None,
+               body: Any = None) -> None:
+        with self._lock:
+            self._faults += [(status, headers or {}, body if body is not None else {"errors": {"stub": "injected"}})] * times
+
+    def next_fault(self) -> Optional[Tuple[int, Dict[str, str], Any]]:
+        with self._lock:
+            return self._faults.pop(0) if self._faults else None
+
+    def day(self, date: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            if date not in self._days:
+                seed = datetime.fromisoformat(date).toordinal()
+                self._days[date] = synthetic_fixtures(date, self.fixtures, seed=seed)
+                self._by_id.update((f["fixture"]["id"], f) for f in self._days[date])
+            return self._days[date]
+
+    def day_odds(self, date: str) -> List[Dict[str, Any]]:
+        fixtures = self.day(date)
+        with self._lock:
+            if date not in self._odds:
+                odds = (synthetic_odds(f, self.bookmakers) for f in fixtures)
+                self._odds[date] = [o for o in odds if o]
+            return self._odds[date]
+
+    def lookup(self, fid: int) -> Optional[Dict[str, Any]]:
+        # id nosi ordinal datuma (seed), pa se dan može izgenerisati i naknadno
+        if fid not in self._by_id:
+            try:
+                self.day(datetime.fromordinal(fid // 1_000_000).strftime("%Y-%m-%d"))
+            except ValueError:
+                return None
+        return self._by_id.get(fid)
+
+    def finished(self, f: Dict[str, Any]) -> Dict[str, Any]:
+        if f["fixture"]["timestamp"] + 2 * 3600 > time.time():
+            return f
+        rnd = random.Random(f["fixture"]["id"] * 31)
+        home, away = rnd.choice([0, 0, 1, 1, 1, 2, 2, 3]), rnd.choice([0, 0, 1, 1, 2, 2, 3])
+        status = "PST" if f["fixture"]["id"] % 97 == 0 else "FT"
+        if status == "PST":
+            home = away = None
+        return {
+            **f,
+            "fixture": {**f["fixture"], "status": {"long": status, "short": status, "elapsed": 90}},
+            "goals": {"home": home, "away": away},
+            "score": {**f["score"], "fulltime": {"home": home, "away": away}},
+        }
+
+    def count(self, path: str) -> Dict[str, str]:
+        # vraća x-ratelimit headere kakve šalje API-Football
+        with self._lock:
+            self.calls[path] = self.calls.get(path, 0) + 1
+            now = time.time()
+            self._minute = [t for t in self._minute if now - t < 60] + [now]
+            headers = {}
+            if self.daily_limit:
+                used = sum(self.calls.values())
+                headers["x-ratelimit-requests-limit"] = str(self.daily_limit)
+                headers["x-ratelimit-requests-remaining"] = str(max(self.daily_limit - used, 0))
+            if self.minute_limit:
+                headers["X-RateLimit-Limit"] = str(self.minute_limit)
+                headers["X-RateLimit-Remaining"] = str(max(self.minute_limit - len(self._minute), 0))
+            return headers
+
+    def over_limit(self, headers: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        if headers.get("x-ratelimit-requests-remaining") == "0" and sum(self.calls.values()) > self.daily_limit:
+            return {"errors": {"requests": "You have reached the request limit for the day"}, "response": []}
+        if self.minute_limit and len(self._minute) > self.minute_limit:
+            return {"errors": {"rateLimit": "Too many requests"}, "response": []}
+        return None
+
+    def handle(self, path: str, q: Dict[str, str]) -> Dict[str, Any]:
+        if path == "/fixtures" and "ids" in q:
+            found = [self.lookup(int(fid)) for fid in q["ids"].split("-")[:20]]
+            return {"response": [self.finished(f) for f in found if f]}
+        if path == "/fixtures":
+            return {"response": [self.finished(f) for f in self.day(q.get("date", "2026-01-01"))]}
+        if path == "/odds" and "fixture" in q:
+            f = self.lookup(int(q["fixture"]))
+            o = synthetic_odds(f, self.bookmakers) if f else None
+            return {"response": [o] if o else []}
+        if path == "/odds":
+            items = [
+                o for o in self.day_odds(q.get("date", "2026-01-01"))
+                if "league" not in q or o["league"]["id"] == int(q["league"])
+            ]
+            page = int(q.get("page", 1))
+            total = max(1, -(-len(items) // PAGE_SIZE))
+            return {
+                "paging": {"current": page, "total": total},
+                "response": items[(page - 1) * PAGE_SIZE:page * PAGE_SIZE],
+            }
+        if path == "/standings":
+            league, season = int(q["league"]), int(q["season"])
+            if league in NO_STANDINGS:
+                return {"response": []}
+            with self._lock:
+                teams = {
+                    t["id"]: t
+                    for day in self._days.values() for f in day if f["league"]["id"] == league
+                    for t in (f["teams"]["home"], f["teams"]["away"])
+                }
+            return {"response": [synthetic_standings(league, season, list(teams.values()))]}
+        if path == "/teams/statistics":
+            return {"response": synthetic_team_statistics(int(q["team"]))}
+        if path == "/fixtures/headtohead":
+            home, _, away = q["h2h"].partition("-")
+            return {"response": synthetic_h2h(int(home), int(away), int(q.get("last", 5)))}
+        return {"errors": {"endpoint": f"unknown {path}"}, "response": []}
+
+    def post(self, path: str, req: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # /v1/responses u obliku OpenAI Responses API, za AI analizu bez mreže
+        if path != "/v1/responses":
+            return None
+        with self._lock:
+            self.calls[path] = self.calls.get(path, 0) + 1
+        text = json.dumps({
+            "title": f"Stub analysis ({req.get('model')})",
+            "summary": str(req.get("input", ""))[:120],
+            "safest_markets": ["Double Chance", "Over 1.5"],
+            "observations": ["stub server"],
+        })
+        return {"output": [{"content": [{"type": "output_text", "text": text}]}]}
+
+def _handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            headers = state.count(url.path)
+            if state.latency:
+                time.sleep(state.latency)
+            fault = state.next_fault()
+            if fault:
+                self._send(fault[0], fault[2], fault[1])
+                return
+            if state.error_rate and random.random() < state.error_rate:
+                self._send(500, {"errors": {"stub": "injected failure"}})
+                return
+            self._send(200, state.over_limit(headers) or state.handle(url.path, q), headers)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            req = json.loads(self.rfile.read(length) or b"{}")
+            if state.latency:
+                time.sleep(state.latency)
+            payload = state.post(urlparse(self.path).path, req)
+            if payload is None:
+                self._send(404, {"error": "not found"})
+                return
+            self._send(200, payload)
+
+        def _send(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None):
+            body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+def serve(state: StubState, port: int = 0):
+    server = ThreadingHTTPServer(("127.0.0.1", port), _handler(state))
+    server.daemon_threads = True
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def bench(calls: int, state: StubState) -> Dict[str, Any]:
+    from . import api
+    server, url = serve(state)
+    api.API_BASE, api.API_KEY = url, "stub"
+    date = "2026-01-01"
+    fixtures = api.get("/fixtures", {"date": date})["response"]
+    ids = [f["fixture"]["id"] for f in fixtures][:calls]
+    t0 = time.perf_counter()
+    results = api.get_many(("/odds", {"fixture": fid}) for fid in ids)
+    wall = time.perf_counter() - t0
+    server.shutdown()
+    return {
+        "calls": len(ids),
+        "failed": sum(isinstance(r, Exception) for r in results),
+        "wall_sec": round(wall, 3),
+        "calls_per_sec": round(len(ids) / wall, 2) if wall else None,
+        "rate": api.RATE,
+        "burst": api.BURST,
+        "workers": api.WORKERS,
+        "adapted_rate": round(api._bucket.rate, 3),
+    }
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--fixtures", type=int, default=100)
+    ap.add_argument("--bookmakers", type=int, default=20)
+    ap.add_argument("--latency", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--daily-limit", type=int, default=0)
+    ap.add_argument("--minute-limit", type=int, default=0)
+    ap.add_argument("--bench", type=int, default=0, help="izmeri api.get_many na N poziva i izađi")
+    args = ap.parse_args()
+    state = StubState(args.fixtures, args.bookmakers, args.latency, args.error_rate, args.daily_limit, args.minute_limit)
+    if args.bench:
+        print(json.dumps(bench(args.bench, state), indent=2))
+    else:
+        server = ThreadingHTTPServer(("127.0.0.1", args.port), _handler(state))
+        print(f"stub API-Football on http://127.0.0.1:{args.port}")
+        server.serve_forever()
@@ -0,0 +1,115 @@
+# src/ttl.py
+# koliko dugo je keširan odgovor svež, po endpointu, na osnovu početka i statusa meča
+import json, os, threading, time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+FOREVER = 10 * 365 * 24 * 3600
+
+NOT_STARTED = {"TBD", "NS"}
+LIVE = {"1H", "HT", "2H", "ET", "BT", "P", "SUSP", "INT", "LIVE"}
+FINISHED = {"FT", "AET", "PEN", "AWD", "WO"}
+CANCELLED = {"PST", "CANC", "ABD"}
+
+# ladder: (sekundi do početka, ttl) - prvi prag koji je >= vremena do početka
+POLICY: Dict[str, Dict[str, Any]] = {
+    "fixtures": {"today": 1800, "live": 300, "future": 3 * 3600, "past": 3600},
+    "odds": {
+        "ladder": [[3600, 300], [6 * 3600, 900], [24 * 3600, 3600], [None, 6 * 3600]],
+        "started": FOREVER,  # prematch kvote se posle početka ne menjaju
+        "cancelled": 6 * 3600,
+        "unknown": 3600,
+    },
+    "predictions": {"not_started": 6 * 3600, "started": FOREVER, "unknown": 3600},
+    "h2h": {"default": 7 * 24 * 3600},
+    "analysis": {"after_kickoff": 3 * 3600, "unknown": 6 * 3600},
+    "stats": {"current": 6 * 3600, "past": FOREVER},
+    "standings": {"current": 6 * 3600, "past": FOREVER},
+}
+
+def _load_overrides() -> None:
+    # npr. TTL_POLICY='{"odds": {"ladder": [[1800, 120], [null, 3600]]}}'
+    raw = os.getenv("TTL_POLICY")
+    if not raw:
+        return
+    for endpoint, values in json.loads(raw).items():
+        POLICY.setdefault(endpoint, {}).update(values)
+
+_load_overrides()
+
+_lock = threading.Lock()
+_fixtures: Dict[int, Tuple[Optional[int], Optional[str]]] = {}
+
+def observe_fixtures(fixtures: Iterable[Any]) -> None:
+    # slim.Fixture zapisi iz odds.fixtures_by_date
+    with _lock:
+        for f in fixtures:
+            _fixtures[f.id] = (f.timestamp, f.status)
+
+def _state(fid: int) -> Tuple[Optional[int], Optional[str]]:
+    with _lock:
+        return _fixtures.get(fid, (None, None))
+
+def _current_season(now: Optional[float] = None) -> int:
+    # evropska sezona 2025 = 2025/26, pa do jula važi prošlogodišnji broj
+    d = datetime.fromtimestamp(now or time.time(), timezone.utc)
+    return d.year if d.month >= 7 else d.year - 1
+
+def for_fixtures(date: str, fixtures: Optional[List[Any]] = None) -> int:
+    p = POLICY["fixtures"]
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    if date > today:
+        return p["future"]
+    statuses = {f.status for f in fixtures or []}
+    if date < today:
+        if fixtures is not None and statuses <= FINISHED | CANCELLED:
+            return FOREVER
+        return p["past"]
+    if statuses & LIVE:
+        return p["live"]
+    return p["today"]
+
+def for_odds(fid: int, now: Optional[float] = None) -> int:
+    p = POLICY["odds"]
+    kickoff, status = _state(fid)
+    if status in CANCELLED:
+        return p["cancelled"]
+    if status in LIVE or status in FINISHED:
+        return p["started"]
+    if kickoff is None:
+        return p["unknown"]
+    until = kickoff - (now or time.time())
+    if until <= 0:
+        return p["started"]
+    for limit, ttl in p["ladder"]:
+        if limit is None or until <= limit:
+            return ttl
+    return p["unknown"]
+
+def for_predictions(fid: int) -> int:
+    p = POLICY["predictions"]
+    _, status = _state(fid)
+    if status in NOT_STARTED:
+        return p["not_started"]
+    if status is None:
+        return p["unknown"]
+    return p["started"]
+
+def for_analysis(fid: int, since: Optional[float] = None) -> int:
+    # analiza važi do početka meča + after_kickoff; posle toga je samo arhiva.
+    # since: kad je analiza keširana; keš poredi ttl sa starošću unosa (sad - since), pa se
+    # rok računa od tog trenutka, ne od sad
+    p = POLICY["analysis"]
+    kickoff, status = _state(fid)
+    if status in LIVE or status in FINISHED:
+        return FOREVER
+    if kickoff is None:
+        return p["unknown"]
+    return max(int(kickoff + p["after_kickoff"] - (since or time.time())), 0)
+
+def for_h2h() -> int:
+    return POLICY["h2h"]["default"]
+
+def for_season(endpoint: str, season: int) -> int:
+    p = POLICY[endpoint]
+    return p["past"] if season < _current_season() else p["current"]
@@ -1,3 +1,4 @@
+import os
 from datetime import datetime, timezone
 
 def today_iso() -> str:
@@ -5,3 +6,9 @@ def today_iso() -> str:
 
 def ensure_list(x):
     return x if isinstance(x, list) else [x]
+
+# lokalno stanje (ledger kvote, keš...) drži se van public/, koji ide na Pages
+STATE_DIR = os.getenv("FF_STATE_DIR") or os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache")
+# trajna istorija (arhiva legova, snimci kvota): ne sme da nestane sa evikcijom keša, pa se
+# u CI drži na zasebnoj grani (data) i posle svakog posla commit-uje; lokalno je u .cache/
+DATA_DIR = os.getenv("FF_DATA_DIR") or STATE_DIR
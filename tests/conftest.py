@@ -0,0 +1,26 @@
+# testovi idu protiv src.stub na lokalnom portu; stanje (ledger, keš) u privremenom direktorijumu
+import os, tempfile
+
+os.environ.setdefault("FF_STATE_DIR", tempfile.mkdtemp(prefix="ff-test-"))
+
+import pytest
+from src import api, quota, stub
+
+@pytest.fixture
+def stub_api(monkeypatch, tmp_path):
+    # (stanje stuba, lista čekanja iz backoff-a); backoff se beleži umesto da se spava,
+    # a svaki test ima svoj ledger kvote (iscrpljena kvota jednog ne seče plan drugog)
+    state = stub.StubState(fixtures=20)
+    server, url = stub.serve(state)
+    sleeps = []
+    monkeypatch.setattr(api, "API_BASE", url)
+    monkeypatch.setattr(api, "API_KEY", "stub")
+    monkeypatch.setattr(api, "ADAPTIVE", False)
+    monkeypatch.setattr(api, "_bucket", api.TokenBucket(1000, 50))
+    monkeypatch.setattr(api, "_session", None)
+    monkeypatch.setattr(api, "_sleep", sleeps.append)
+    monkeypatch.setattr(quota, "LEDGER_PATH", str(tmp_path / "quota.json"))
+    monkeypatch.setattr(quota, "_ledger", None)
+    yield state, sleeps
+    server.shutdown()
+    server.server_close()
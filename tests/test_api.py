@@ -0,0 +1,94 @@
+import time
+import pytest
+from src import api
+
+DATE = "2026-10-17"
+
+def test_get_ok(stub_api):
+    state, sleeps = stub_api
+    data = api.get("/fixtures", {"date": DATE})
+    assert len(data["response"]) == 20
+    assert state.calls == {"/fixtures": 1}
+    assert sleeps == []
+
+def test_429_waits_retry_after(stub_api):
+    state, sleeps = stub_api
+    state.inject(429, headers={"Retry-After": "7"})
+    data = api.get("/fixtures", {"date": DATE})
+    assert data["response"]
+    assert sleeps == [7.0]
+    assert state.calls["/fixtures"] == 2
+
+def test_retry_after_capped(stub_api):
+    state, sleeps = stub_api
+    state.inject(429, headers={"Retry-After": "3600"})
+    api.get("/fixtures", {"date": DATE})
+    assert sleeps == [api.BACKOFF_MAX]
+
+def test_5xx_retried_then_success(stub_api):
+    state, sleeps = stub_api
+    state.inject(503, times=api.RETRIES - 1)
+    data = api.get("/fixtures", {"date": DATE})
+    assert data["response"]
+    assert len(sleeps) == api.RETRIES - 1
+    assert state.calls["/fixtures"] == api.RETRIES
+
+def test_5xx_gives_up(stub_api):
+    state, _ = stub_api
+    state.inject(500, times=api.RETRIES)
+    with pytest.raises(api.ApiError) as e:
+        api.get("/fixtures", {"date": DATE})
+    assert e.value.status == 500
+    assert state.calls["/fixtures"] == api.RETRIES
+
+@pytest.mark.parametrize("status", [400, 401, 403, 404])
+def test_4xx_raises_immediately(stub_api, status):
+    state, sleeps = stub_api
+    state.inject(status)
+    with pytest.raises(api.ApiError) as e:
+        api.get("/fixtures", {"date": DATE})
+    assert e.value.status == status
+    assert state.calls["/fixtures"] == 1
+    assert sleeps == []
+
+def test_non_json_200_retried(stub_api):
+    state, sleeps = stub_api
+    state.inject(200, body=b"<html>gateway</html>")
+    data = api.get("/fixtures", {"date": DATE})
+    assert data["response"]
+    assert len(sleeps) == 1
+
+def test_non_json_200_gives_up(stub_api):
+    state, _ = stub_api
+    state.inject(200, times=api.RETRIES, body=b"")
+    with pytest.raises(api.ApiError, match="invalid JSON"):
+        api.get("/fixtures", {"date": DATE})
+
+def test_quota_in_body(stub_api):
+    state, _ = stub_api
+    state.inject(200, body={"errors": {"requests": "limit reached"}, "response": []})
+    with pytest.raises(api.QuotaExceeded):
+        api.get("/fixtures", {"date": DATE})
+    assert state.calls["/fixtures"] == 1
+
+def test_get_many_keeps_order_and_errors(stub_api):
+    state, _ = stub_api
+    fids = [f["fixture"]["id"] for f in state.day(DATE)[:6]]
+    state.inject(404)
+    results = api.get_many(("/odds", {"fixture": fid}) for fid in fids)
+    assert len(results) == len(fids)
+    assert sum(isinstance(r, api.ApiError) for r in results) == 1
+    for fid, r in zip(fids, results):
+        if not isinstance(r, Exception) and r["response"]:
+            assert r["response"][0]["fixture"]["id"] == fid
+
+def test_token_bucket_paces(stub_api, monkeypatch):
+    # burst 2 pa 20/s: 6 poziva traje bar 4 × 50ms
+    monkeypatch.setattr(api, "_bucket", api.TokenBucket(20, 2))
+    started = time.monotonic()
+    api.get_many(("/fixtures", {"date": DATE}) for _ in range(6))
+    assert time.monotonic() - started >= 0.19
+
+def test_token_bucket_burst_is_free():
+    bucket = api.TokenBucket(1, 3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
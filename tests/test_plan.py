@@ -0,0 +1,26 @@
+from src import odds, plan
+
+DATE = "2026-10-21"
+
+def test_dry_run_matches_odds_calls(stub_api, monkeypatch):
+    # uzak termin: /odds?date= bi i dalje listao ceo dan, pa su jeftiniji pozivi po meču
+    state, _ = stub_api
+    state.fixtures = 120
+    monkeypatch.setattr(plan, "PLAN_WINDOW", "12-12.5")
+    monkeypatch.setattr(odds, "ODDS_BULK", "date")
+    p = plan.make(DATE)
+    assert len(p.fixtures) < p.day == 120
+    for _ in plan.stream(p):
+        pass
+    assert state.calls["/odds"] == p.calls == len(p.fixtures)
+
+def test_dry_run_counts_day_pages(stub_api, monkeypatch):
+    # ceo dan: strane /odds?date= po svim mečevima dana, ne po broju onih u planu
+    state, _ = stub_api
+    state.fixtures = 120
+    monkeypatch.setattr(plan, "PLAN_WINDOW", "0-24")
+    monkeypatch.setattr(odds, "ODDS_BULK", "date")
+    p = plan.make("2026-10-22")
+    for _ in plan.stream(p):
+        pass
+    assert state.calls["/odds"] <= p.calls